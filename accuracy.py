@@ -0,0 +1,203 @@
+# accuracy.py
+"""Forecast skill measured against what actually happened, kept as running per-lead-time error sums.
+
+Every forecast snapshot written to the history store stays "pending" until its last step has passed. Each new
+observation is compared with the temperature every pending snapshot predicted for that moment (interpolated
+between its 3-hourly steps) and folded into count / error sums for the snapshot's lead-time bucket. Each
+snapshot is scored at most once per bucket, so frequent refreshes don't outweigh quiet locations. Reading the
+statistics never touches history: they are a handful of numbers per location, persisted as JSON."""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from history_store import forecast_with_valid, get_history_store
+from metrics import REGISTRY
+
+LEAD_BUCKET = 3 * 3600 # forecast steps are 3-hourly
+MAX_LEAD = 5 * 86400 # the /forecast payload covers five days
+BUCKETS = MAX_LEAD // LEAD_BUCKET
+HIT_TOLERANCE = 2.0 # °C; a forecast within this of the observation counts as a hit
+MIN_SAMPLES = 5 # below this a location falls back to the all-locations statistics
+STATE_FILE = 'accuracy.json'
+FIELDS = ('count', 'error', 'abs_error', 'hits')
+def _empty():
+    return {field: np.zeros(BUCKETS) for field in FIELDS}
+def summarize(stats, max_lead=MAX_LEAD):
+    """{'count', 'mae', 'bias', 'hit_rate'} over the lead buckets below max_lead seconds, or None without samples"""
+    last = max(1, min(BUCKETS, -(-max_lead // LEAD_BUCKET)))
+    count = stats['count'][:last].sum()
+    if not count:
+        return None
+    return {
+        'count': int(count),
+        'mae': float(stats['abs_error'][:last].sum() / count),
+        'bias': float(stats['error'][:last].sum() / count),
+        'hit_rate': float(stats['hits'][:last].sum() / count),
+    }
+class PendingForecast:
+    """One stored forecast snapshot still waiting for observations"""
+    __slots__ = ('issued', 'valid', 'temp', 'next_bucket')
+
+    def __init__(self, issued, valid, temp, next_bucket=0):
+        self.issued = int(issued)
+        self.valid = np.asarray(valid, dtype='int64')
+        self.temp = np.asarray(temp, dtype='float64')
+        self.next_bucket = next_bucket
+
+    def score(self, ts, observed):
+        """(bucket, forecast - observed) for an observation at ts, or None if not scorable / already scored"""
+        if not self.valid[0] <= ts <= self.valid[-1]:
+            return None
+        bucket = (ts - self.issued) // LEAD_BUCKET
+        if bucket < self.next_bucket or bucket >= BUCKETS:
+            return None
+        self.next_bucket = bucket + 1
+        return int(bucket), float(np.interp(ts, self.valid, self.temp)) - observed
+class AccuracyTracker:
+    def __init__(self, store=None, path=None):
+        self.store = store or get_history_store()
+        self.path = path or os.path.join(self.store.root, STATE_FILE)
+        self._lock = threading.Lock()
+        self._pending = {} # location dir -> [PendingForecast], loaded on first use
+        self._stats = {} # location dir -> {field: per-bucket array}
+        self._watermarks = {} # location dir -> newest observation ts scored
+        self._overall = _empty()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                saved = json.load(handle)
+        except (OSError, ValueError):
+            return
+        for location, entry in saved.items():
+            stats = _empty()
+            for field in FIELDS:
+                values = np.asarray(entry.get(field, []), dtype='float64')[:BUCKETS]
+                stats[field][:len(values)] = values
+            self._stats[location] = stats
+            self._watermarks[location] = int(entry.get('watermark', 0))
+            for field in FIELDS:
+                self._overall[field] += stats[field]
+
+    def _save(self):
+        state = {location: {'watermark': self._watermarks.get(location, 0),
+                            **{field: stats[field].tolist() for field in FIELDS}}
+                 for location, stats in self._stats.items()}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(state, handle)
+        os.replace(temp_path, self.path)
+
+    def _pending_for(self, location, lat, lon, now):
+        """Snapshots for this location that can still be scored; read from the store once per process"""
+        pending = self._pending.get(location)
+        if pending is None:
+            watermark = self._watermarks.get(location, 0)
+            # issued < now: a snapshot written by this very call is appended by record_snapshot itself
+            frame = self.store.forecasts(lat, lon, now - MAX_LEAD, now - 1)
+            pending = []
+            for issued, steps in frame.groupby('issued', sort=True):
+                issued = int(issued.timestamp())
+                valid = steps['valid'].to_numpy().astype('datetime64[s]').astype('int64')
+                order = np.argsort(valid)
+                next_bucket = (watermark - issued) // LEAD_BUCKET + 1 if watermark > issued else 0
+                pending.append(PendingForecast(issued, valid[order], steps['temp'].to_numpy()[order], next_bucket))
+            self._pending[location] = pending
+        return pending
+
+    def record_snapshot(self, lat, lon, snapshot):
+        """Store the snapshot in history, score its observation against pending forecasts, then queue its forecast"""
+        now = int(time.time())
+        observed, forecasted = self.store.record_snapshot(lat, lon, snapshot, issued=now)
+        if not (observed or forecasted):
+            return 0
+        location = self.store.location_dir(lat, lon)
+        scored = 0
+        with self._lock:
+            pending = self._pending_for(location, lat, lon, now)
+            if observed:
+                scored = self._score(location, pending, snapshot.current)
+            if forecasted:
+                frame = forecast_with_valid(snapshot)
+                pending.append(PendingForecast(now, frame['valid'].to_numpy(), frame['temp'].to_numpy()))
+            # a snapshot whose last step has passed can never be scored again
+            self._pending[location] = [item for item in pending if item.valid[-1] >= snapshot.current.observed_at]
+            if scored:
+                self._save()
+        return scored
+
+    def _score(self, location, pending, current):
+        stats = self._stats.setdefault(location, _empty())
+        scored = 0
+        for item in pending:
+            result = item.score(current.observed_at, current.temp)
+            if result is None:
+                continue
+            bucket, error = result
+            for target in (stats, self._overall):
+                target['count'][bucket] += 1
+                target['error'][bucket] += error
+                target['abs_error'][bucket] += abs(error)
+                target['hits'][bucket] += abs(error) <= HIT_TOLERANCE
+            scored += 1
+        self._watermarks[location] = max(self._watermarks.get(location, 0), current.observed_at)
+        return scored
+
+    def summary(self, lat, lon, max_lead=MAX_LEAD):
+        """Error summary for this location up to max_lead seconds ahead, with 'scope' 'location' or 'all';
+        None until any forecast has been scored"""
+        with self._lock:
+            stats = self._stats.get(self.store.location_dir(lat, lon))
+            local = summarize(stats, max_lead) if stats else None
+            if local and local['count'] >= MIN_SAMPLES:
+                return {**local, 'scope': 'location'}
+            overall = summarize(self._overall, max_lead)
+        return {**overall, 'scope': 'all'} if overall else None
+
+    def by_lead_day(self, lat, lon):
+        """Rows of {'lead_day', 'count', 'mae', 'bias', 'hit_rate'} for this location, one per forecast day"""
+        with self._lock:
+            stats = self._stats.get(self.store.location_dir(lat, lon))
+            if stats is None:
+                return []
+            per_day = 86400 // LEAD_BUCKET
+            rows = []
+            for day in range(BUCKETS // per_day):
+                window = slice(day * per_day, (day + 1) * per_day)
+                day_stats = summarize({field: values[window] for field, values in stats.items()})
+                if day_stats:
+                    rows.append({'lead_day': day + 1, **day_stats})
+        return rows
+
+    def overall_by_lead_day(self):
+        with self._lock:
+            per_day = 86400 // LEAD_BUCKET
+            days = [summarize({field: values[day * per_day:(day + 1) * per_day] for field, values in self._overall.items()})
+                    for day in range(BUCKETS // per_day)]
+        return [(day + 1, stats) for day, stats in enumerate(days) if stats]
+def accuracy_metrics(tracker):
+    """Scrape-time metric families: all-locations error per forecast day"""
+    days = tracker.overall_by_lead_day()
+    return [
+        ('weather_forecast_temp_mae_celsius', 'gauge', 'Mean absolute temperature forecast error by lead day',
+         [({'lead_day': day}, stats['mae']) for day, stats in days]),
+        ('weather_forecast_temp_bias_celsius', 'gauge', 'Mean temperature forecast error (forecast - observed) by lead day',
+         [({'lead_day': day}, stats['bias']) for day, stats in days]),
+        ('weather_forecast_scored_total', 'counter', 'Forecast steps scored against observations by lead day',
+         [({'lead_day': day}, stats['count']) for day, stats in days]),
+    ]
+_tracker = None
+_tracker_lock = threading.Lock()
+def get_accuracy_tracker():
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                _tracker = AccuracyTracker()
+                REGISTRY.register_collector(lambda: accuracy_metrics(_tracker))
+    return _tracker
@@ -1,44 +1,49 @@
 # app.py
 import streamlit as st
-import requests
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta, timezone, date
-import math
+from datetime import datetime, timezone
 import pandas as pd
 import numpy as np
-from geopy.geocoders import Nominatim
-from streamlit_lottie import st_lottie
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit_autorefresh import st_autorefresh
-import folium
-from streamlit_folium import st_folium
 from dotenv import load_dotenv
 import os
-import json
-import sqlite3
-from io import StringIO
+import uuid
 import time
-import random
+import atexit
 import warnings
+# Load environment variables before the local modules below - several read their settings at import time
+load_dotenv()
+from fetcher import inflight as fetch_inflight
+from http_client import get_http_client
+from weather_cache import get_response_cache
+from storage import get_store
+from weather_service import get_weather_service, openweather_key_from_env
+from prefetch import get_prefetcher
+from ip_locator import get_ip_locator
+from llm import BREAKER_RESET_SECONDS, FALLBACK_INSIGHT, AnthropicProvider, GroqProvider, LLMRouter
+from metrics import REGISTRY, UPSTREAM_BYTES, UPSTREAM_REQUESTS, UPSTREAM_RETRIES, timed_operation
+from units import convert_speed, convert_temp, speed_symbol, temp_symbol
+from figure_cache import get_figure_cache
+from history_store import get_history_store
+from accuracy import HIT_TOLERANCE, get_accuracy_tracker
+from nowcast import MAX_HISTORY_DAYS, daily_outlook, nowcast
+from solar import get_exposure_cache, solar_elevation, uv_index, uv_level
+from insight_cache import TEMP_BUCKET, NotCached, get_insight_cache, make_insight_key
+from lazy_import import lazy_callable, lazy_module, module_available
+# Heavy libraries only needed by some views load on first use, so a cold worker renders sooner
+px = lazy_module('plotly.express')
+go = lazy_module('plotly.graph_objects')
+make_subplots = lazy_callable('plotly.subplots', 'make_subplots')
+folium = lazy_module('folium')
+st_folium = lazy_callable('streamlit_folium', 'st_folium')
+st_lottie = lazy_callable('streamlit_lottie', 'st_lottie')
 # Suppress dotenv warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="dotenv")
-# Groq import with fallback
-GROQ_AVAILABLE = False
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    Groq = None
-# Anthropic import with fallback
-ANTHROPIC_AVAILABLE = False
-try:
-    from anthropic import Anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    Anthropic = None
-# Load environment variables
-load_dotenv()
+# Groq / Anthropic SDKs are imported only when a client is created for a configured key
+GROQ_AVAILABLE = module_available('groq')
+Groq = lazy_callable('groq', 'Groq') if GROQ_AVAILABLE else None
+ANTHROPIC_AVAILABLE = module_available('anthropic')
+Anthropic = lazy_callable('anthropic', 'Anthropic') if ANTHROPIC_AVAILABLE else None
 # Page configuration
 st.set_page_config(
     page_title="Next-Gen Weather App",
@@ -46,8 +51,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
-# Auto-refresh every 10 minutes
-st_autorefresh(interval=600000, limit=None, key="weather_refresh")
+# Auto-refresh every 10 minutes; the data is re-read from the cache the prefetcher keeps warm
+refresh_count = st_autorefresh(interval=600000, limit=None, key="weather_refresh")
 # Enhanced CSS with simple animation
 css = """
 <style>
@@ -171,10 +176,11 @@ css = """
 """
 st.markdown(css, unsafe_allow_html=True)
 class WeatherAI:
-    def __init__(self):
-        self.mood = "neutral"
+    def __init__(self, app):
+        # Shared by every session, so mood is derived per call rather than stored
+        self.app = app
        
-    def set_mood(self, weather_condition):
+    def get_mood(self, weather_condition):
         mood_map = {
             'clear': 'happy',
             'clouds': 'calm',
@@ -183,14 +189,14 @@ class WeatherAI:
             'snow': 'playful',
             'mist': 'mysterious'
         }
-        self.mood = mood_map.get(weather_condition, 'neutral')
+        return mood_map.get(weather_condition, 'neutral')
    
     def get_response(self, weather_data):
-        temp = weather_data['main']['temp']
-        condition = weather_data['weather'][0]['main'].lower()
-        self.set_mood(condition)
         unit = st.session_state.get('unit', 'metric')
-        unit_symbol = '°C' if unit == 'metric' else '°F'
+        unit_symbol = temp_symbol(unit)
+        temp = convert_temp(weather_data.temp, unit)
+        condition = weather_data.condition.lower()
+        mood = self.get_mood(condition)
        
         # Improved structured responses with more context and advice
         base_responses = {
@@ -201,16 +207,27 @@ class WeatherAI:
             'playful': f"❄️ Snowy wonderland at {temp:.1f}{unit_symbol}! Bundle up for winter fun like snowball fights. Roads may be slippery – drive cautiously.",
             'mysterious': f"🌫️ Misty atmosphere at {temp:.1f}{unit_symbol}. Visibility low, so take care while driving. Great for cozy reading sessions."
         }
-        response = base_responses.get(self.mood, f"Current temperature is {temp:.1f}{unit_symbol} with {condition} conditions. Check alerts for updates.")
+        response = base_responses.get(mood, f"Current temperature is {temp:.1f}{unit_symbol} with {condition} conditions. Check alerts for updates.")
        
-        # Add AI insight for better structure
-        insight_prompt = f"Given {condition} weather at {temp:.1f}{unit_symbol} in {st.session_state.location}, provide 1-2 concise, actionable tips."
-        insight = weather_app.get_ai_insight(insight_prompt) if hasattr(weather_app, 'get_ai_insight') else "Stay hydrated and dressed appropriately."
+        # Add AI insight for better structure - cached on normalized inputs so reruns don't call the LLM
+        insight_key = make_insight_key(st.session_state.location, condition, temp, unit)
+        low = insight_key[2]
+        insight_prompt = f"Given {condition} weather between {low}{unit_symbol} and {low + TEMP_BUCKET:.0f}{unit_symbol} in {st.session_state.location}, provide 1-2 concise, actionable tips."
+        def compute():
+            text = self.app.get_ai_insight(insight_prompt)
+            return NotCached(text) if text == FALLBACK_INSIGHT.strip() else text
+        insights = get_insight_cache()
+        insight = insights.get_or_compute(insight_key, compute)
+        for message in insights.take_errors():
+            st.warning(message)
         return f"{response}\n\n**Quick Tip:** {insight}"
 class AdvancedWeatherApp:
     def __init__(self):
-        self.ai_assistant = WeatherAI()
+        self.created_at = time.time()
+        self.init_errors = []
+        self.ai_assistant = WeatherAI(self)
         self.setup_apis()
+        self.service = get_weather_service()
         self.groq_client = None
         groq_key = self.get_api_key('groq')
         if groq_key:
@@ -219,7 +236,7 @@ class AdvancedWeatherApp:
                 try:
                     self.groq_client = Groq(api_key=groq_key)
                 except Exception as e:
-                    st.error(f"Groq initialization failed: {e}")
+                    self.init_errors.append(f"Groq initialization failed: {e}")
         self.anthropic_client = None
         anthropic_key = os.getenv("ANTHROPIC_API_KEY")
         if anthropic_key:
@@ -227,12 +244,28 @@ class AdvancedWeatherApp:
                 try:
                     self.anthropic_client = Anthropic(api_key=anthropic_key)
                 except Exception as e:
-                    st.error(f"Anthropic initialization failed: {e}")
+                    self.init_errors.append(f"Anthropic initialization failed: {e}")
+        providers = []
+        if self.groq_client:
+            providers.append(GroqProvider(self.groq_client))
+        if self.anthropic_client:
+            providers.append(AnthropicProvider(self.anthropic_client))
+        self.llm = LLMRouter(
+            providers,
+            on_error=self.report_llm_error,
+            hedge_delay=self.get_hedge_delay()
+        )
        
+    def report_llm_error(self, provider, e):
+        message = f"{provider.label} API error: {e} – skipping it for {BREAKER_RESET_SECONDS}s."
+        if get_script_run_ctx(suppress_warning=True) is None:
+            # an insight refresh thread - st.warning would be dropped, so the next insight read shows it
+            get_insight_cache().defer_error(message)
+        else:
+            st.warning(message)
+
     def setup_apis(self):
-        openweather_key = (os.getenv("OPENWEATHER_API_KEY") or
-                           os.getenv("OpenWeatherMap") or
-                           os.getenv("WEATHER_API_KEY"))
+        openweather_key = openweather_key_from_env()
         groq_key = os.getenv("GROQ_API_KEY")
         self.apis = {
             'openweather': openweather_key,
@@ -243,215 +276,85 @@ class AdvancedWeatherApp:
     def get_api_key(self, service='openweather'):
         return self.apis.get(service)
    
-    def get_ai_insight(self, prompt):
-        """Get AI insight with fallback across providers - improved with structured output"""
-        system_prompt = "You are a weather expert. Provide concise, structured, and actionable insights. Use bullet points for tips and keep responses under 100 words."
-        full_prompt = f"{system_prompt}\n\nUser query: {prompt}"
-       
-        if self.groq_client:
-            try:
-                completion = self.groq_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile", # Updated to supported model
-                    messages=[{"role": "system", "content": system_prompt},
-                              {"role": "user", "content": prompt}]
-                )
-                return completion.choices[0].message.content.strip()
-            except Exception as e:
-                st.warning(f"Groq API error: {e}")
-                pass
-        if self.anthropic_client:
-            try:
-                message = self.anthropic_client.messages.create(
-                    model="claude-3-5-sonnet-20240620",
-                    max_tokens=300,
-                    messages=[{"role": "user", "content": full_prompt}]
-                )
-                return message.content[0].text.strip()
-            except Exception as e:
-                st.warning(f"Anthropic API error: {e}")
-                pass
-        # Fallback structured response
-        return "- Monitor local alerts for sudden changes.\n- Dress in layers for variable conditions.\n- Stay hydrated regardless of temperature."
-   
-    def get_lat_lon_from_location(self, query):
-        """Enhanced geocoding with fallback - improved error handling"""
-        lat, lon, full_loc = None, None, None
-        key = self.get_api_key('openweather')
-       
-        # Try OpenWeather if key available
-        if key:
-            try:
-                url = f"http://api.openweathermap.org/geo/1.0/direct?q={query}&limit=1&appid={key}"
-                resp = requests.get(url, timeout=10)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data:
-                        item = data[0]
-                        return item['lat'], item['lon'], f"{item['name']}, {item.get('state', '')}, {item.get('country', '')}".strip(", ")
-            except Exception as e:
-                st.warning(f"OpenWeather geocoding failed: {e}")
-       
-        # Fallback to Nominatim
-        try:
-            geolocator = Nominatim(user_agent="weather_app")
-            location = geolocator.geocode(query, timeout=10)
-            if location:
-                address_parts = location.address.split(',')
-                full_loc = ', '.join(address_parts[-3:]).strip()
-                return location.latitude, location.longitude, full_loc
-        except Exception as e:
-            st.warning(f"Nominatim geocoding failed: {e}")
-       
-        return None, None, None
-   
-    def get_comprehensive_weather(self, lat, lon):
-        """Get enhanced weather data from multiple sources - improved error handling"""
+    def get_hedge_delay(self):
+        """LLM_HEDGE_DELAY: unset for in-order fallback, seconds to race the next provider, or 'auto' for the p90 TTFT"""
+        value = (os.getenv("LLM_HEDGE_DELAY") or "").strip().lower()
+        if not value:
+            return None
+        if value == 'auto':
+            return 'auto'
         try:
-            units = st.session_state.get('unit', 'metric')
-            key = self.get_api_key('openweather')
-            if not key:
-                st.error("OpenWeather API key not found. Please check your .env file.")
-                return None
-           
-            # OpenWeather Current Data
-            url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={key}&units={units}"
-            resp = requests.get(url, timeout=10)
-            if resp.status_code != 200:
-                st.error(f"Current weather fetch failed: {resp.status_code}")
-                return None
-            current = resp.json()
-           
-            if 'cod' in current and current['cod'] != 200:
-                st.error(f"API Error: {current.get('message', 'Unknown')}")
-                return None
-           
-            # OpenWeather Forecast (5-day 3-hourly)
-            forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={key}&units={units}"
-            forecast_resp = requests.get(forecast_url, timeout=10)
-            if forecast_resp.status_code != 200:
-                st.warning("Forecast fetch partial failure - using current data only.")
-                forecast = {'list': [], 'cod': "200"}
-            else:
-                forecast = forecast_resp.json()
-                if 'cod' in forecast and forecast['cod'] != "200":
-                    forecast = {'list': [], 'cod': "200"}
-           
-            # Calculate daily from forecast
-            daily_forecast = self.calculate_daily_from_forecast(forecast['list'])
-           
-            # Air Quality
-            aqi_url = f"http://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lon}&appid={key}"
-            aqi_resp = requests.get(aqi_url, timeout=10)
-            if aqi_resp.status_code != 200:
-                st.warning("Air quality data unavailable.")
-                aqi_data = {'list': [{'main': {'aqi': 1}}], 'cod': 200}
-            else:
-                aqi_data = aqi_resp.json()
-                if aqi_data.get('cod') != 200:
-                    aqi_data = {'list': [{'main': {'aqi': 1}}], 'cod': 200}
-           
-            # Pollen simulation
-            pollen_data = self.simulate_pollen_data(current)
-           
-            return {
-                'current': current,
-                'forecast': forecast,
-                'daily_forecast': daily_forecast,
-                'air_quality': aqi_data,
-                'pollen': pollen_data,
-                'alerts': self.get_weather_alerts(current)
-            }
-        except Exception as e:
-            st.error(f"Comprehensive weather fetch failed: {e}")
+            return float(value)
+        except ValueError:
             return None
    
-    def calculate_daily_from_forecast(self, forecast_list):
-        """Calculate daily max/min from 3-hour forecast - fixed to properly aggregate"""
-        if not forecast_list:
-            return {}
-        daily = {}
-        for item in forecast_list:
-            dt = datetime.fromtimestamp(item['dt'])
-            date_key = dt.strftime('%Y-%m-%d')
-            if date_key not in daily:
-                daily[date_key] = {'temps': [], 'conditions': [], 'pop': []}
-            daily[date_key]['temps'].append(item['main']['temp'])
-            daily[date_key]['conditions'].append(item['weather'][0]['description'])
-            daily[date_key]['pop'].append(item.get('pop', 0))
-       
-        processed_daily = {}
-        for date_key, data in daily.items():
-            processed_daily[date_key] = {
-                'max_temp': max(data['temps']),
-                'min_temp': min(data['temps']),
-                'main_condition': max(set(data['conditions']), key=data['conditions'].count),
-                'avg_pop': np.mean(data['pop'])
-            }
-        return processed_daily
-   
-    def simulate_pollen_data(self, weather_data):
-        """Simulate pollen data based on weather conditions - improved realism"""
-        temp_f = weather_data['main']['temp']
-        unit = st.session_state.get('unit', 'metric')
-        temp_c = temp_f if unit == 'metric' else (temp_f - 32) * 5 / 9
-        humidity = weather_data['main']['humidity']
-       
-        # More realistic simulation
-        tree_pollen = max(0, min(10, (temp_c - 5) * 0.5 - humidity * 0.05))
-        grass_pollen = max(0, min(10, (temp_c - 10) * 0.4 if temp_c > 15 else 0))
-        weed_pollen = max(0, min(10, (30 - humidity) * 0.2 if temp_c > 20 else 0))
-       
-        overall = (tree_pollen + grass_pollen + weed_pollen) / 3
-       
+    def health(self):
+        """Snapshot of the shared resources for the sidebar health panel"""
+        try:
+            get_store().ping()
+            store_ok = True
+        except Exception:
+            store_ok = False
         return {
-            'tree': round(tree_pollen, 1),
-            'grass': round(grass_pollen, 1),
-            'weed': round(weed_pollen, 1),
-            'overall': round(overall, 1)
+            'uptime_s': time.time() - self.created_at,
+            'openweather_key': bool(self.get_api_key('openweather')),
+            'llm_providers': {name: breaker.state for name, breaker in self.llm.breakers.items()},
+            'http_hosts': get_http_client().hosts(),
+            'response_cache': get_response_cache().stats(),
+            'store_ok': store_ok,
+            'prefetch': get_prefetcher().stats(),
+            'init_errors': list(self.init_errors),
         }
    
-    def get_weather_alerts(self, weather_data):
-        """Generate weather alerts based on conditions - improved thresholds"""
-        alerts = []
-        temp_f = weather_data['main']['temp']
-        unit = st.session_state.get('unit', 'metric')
-        temp_c = temp_f if unit == 'metric' else (temp_f - 32) * 5 / 9
-        condition = weather_data['weather'][0]['main'].lower()
-        wind_speed = weather_data.get('wind', {}).get('speed', 0)
-        if unit == 'imperial':
-            wind_kmh = wind_speed * 1.60934
-        else:
-            wind_kmh = wind_speed * 3.6 # m/s to km/h
-       
-        if temp_c > 32:
-            alerts.append("🌡️ Heat Warning: Temperatures above 32°C – risk of heatstroke.")
-        if temp_c < -5:
-            alerts.append("❄️ Freezing Warning: Below -5°C – frostbite and icy roads possible.")
-        if wind_kmh > 40:
-            alerts.append("💨 High Wind Warning: Gusts over 40 km/h – secure outdoor items.")
-        if 'thunder' in condition or 'storm' in condition:
-            alerts.append("⚡ Thunderstorm Alert: Lightning and heavy rain expected.")
-        if condition in ['rain', 'drizzle'] and weather_data['main'].get('humidity', 0) > 80:
-            alerts.append("🌧️ Heavy Rain Advisory: Flooding risk in low areas.")
-           
-        return alerts
+    def close(self):
+        """Release pooled connections and worker threads; registered with atexit"""
+        get_prefetcher().stop()
+        self.llm.close()
+        get_http_client().close()
+   
+    def get_ai_insight(self, prompt):
+        """Get AI insight with fallback across providers - improved with structured output"""
+        with timed_operation('ai_insight') as op:
+            insight = self.llm.complete(prompt)
+            if insight == FALLBACK_INSIGHT.strip():
+                op['outcome'] = 'fallback'
+        return insight
+   
+    def get_ai_insight_stream(self, prompt, timing=None):
+        """Same provider fallback as get_ai_insight, yielding tokens as they arrive"""
+        return self.llm.stream(prompt, timing)
+   
+    def get_lat_lon_from_location(self, query):
+        """Geocode through the shared service, surfacing its fallback warnings"""
+        result = self.service.geocode(query)
+        for warning in result.warnings:
+            st.warning(warning)
+        return result.lat, result.lon, result.full_loc
+   
+    def get_comprehensive_weather(self, lat, lon):
+        """Metric WeatherSnapshot from the headless service; its errors and warnings are shown here"""
+        result = self.service.get_weather(lat, lon)
+        for error in result.errors:
+            st.error(error)
+        for warning in result.warnings:
+            st.warning(warning)
+        return result.snapshot
    
     def create_weather_map(self, lat, lon, weather_data):
         """Create interactive weather map"""
         unit = st.session_state.get('unit', 'metric')
-        unit_symbol = '°C' if unit == 'metric' else '°F'
         m = folium.Map(location=[lat, lon], zoom_start=10)
        
         # Current location marker
         folium.Marker(
             [lat, lon],
-            popup=f"Current: {weather_data['current']['main']['temp']}{unit_symbol}<br>{weather_data['current']['weather'][0]['description']}",
+            popup=f"Current: {convert_temp(weather_data.current.temp, unit):.1f}{temp_symbol(unit)}<br>{weather_data.current.description}",
             tooltip="Your Location",
             icon=folium.Icon(color='red', icon='cloud')
         ).add_to(m)
        
         # Weather overlay circle
-        condition = weather_data['current']['weather'][0]['main']
+        condition = weather_data.current.condition
         color_map = {
             'Clear': 'yellow', 'Clouds': 'gray', 'Rain': 'blue',
             'Snow': 'cyan', 'Thunderstorm': 'purple', 'Mist': 'lightgray'
@@ -466,19 +369,38 @@ class AdvancedWeatherApp:
         ).add_to(m)
        
         return m
-# Global app instance
-weather_app = AdvancedWeatherApp()
+@st.cache_resource(show_spinner=False)
+def get_weather_app():
+    """One AdvancedWeatherApp (API clients, geocoder, LLM router) per process, shared by all sessions"""
+    app = AdvancedWeatherApp()
+    atexit.register(app.close)
+    return app
+# Shared app instance
+weather_app = get_weather_app()
 # Session state initialization
 if 'user_location_accessed' not in st.session_state:
     st.session_state.user_location_accessed = False
 default_states = {
     'lat': 40.7128, 'lon': -74.0060, 'location': "New York, US",
     'weather_data': None, 'forecast_data': None, 'unit': 'metric',
-    'favorites': [], 'theme': 'auto'
+    'theme': 'auto', 'lazy_tabs': True
 }
 for key, value in default_states.items():
     if key not in st.session_state:
         st.session_state[key] = value
+# Favorites persist per user; the id rides in the URL so a bookmark restores them
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = st.query_params.get('uid') or uuid.uuid4().hex
+    st.query_params['uid'] = st.session_state.user_id
+if 'favorites' not in st.session_state:
+    st.session_state.favorites = get_store().list_favorites(st.session_state.user_id)
+# Auto-refresh ticks reload the current location without a spinner; hot locations are served from cache
+if refresh_count and refresh_count != st.session_state.get('last_refresh_count') and st.session_state.weather_data:
+    refreshed = weather_app.service.get_weather(st.session_state.lat, st.session_state.lon).snapshot
+    if refreshed is not None:
+        st.session_state.weather_data = refreshed
+    get_prefetcher().touch(st.session_state.lat, st.session_state.lon)
+st.session_state.last_refresh_count = refresh_count
 # Main App Layout
 def main():
     st.markdown('<h1 class="futuristic-font neon-text">🌦️ Advanced Weather Forecast</h1>', unsafe_allow_html=True)
@@ -492,6 +414,10 @@ def main():
         # Location Input
         st.markdown("### 📍 Location")
         location_query = st.text_input("Search City/ZIP/Coords", placeholder="e.g., London, UK")
+        if location_query:
+            suggestions = weather_app.service.suggest(location_query)
+            if suggestions:
+                st.caption("Matches: " + " • ".join(dict.fromkeys(suggestions)))
        
         col1, col2 = st.columns(2)
         with col1:
@@ -506,25 +432,16 @@ def main():
             st.markdown("**Use My Location**")
             permission = st.checkbox("Allow access to your location via IP? ", value=st.session_state.user_location_accessed)
             if permission and not st.session_state.user_location_accessed:
-                st.info("🔄 Automatically fetching your location...")
-                try:
-                    response = requests.get('http://ip-api.com/json', timeout=10)
-                    data = response.json()
-                    if data['status'] == 'success':
-                        lat, lon = data['lat'], data['lon']
-                        full_loc = f"{data['city']}, {data['country']}"
-                        st.session_state.user_location_accessed = True
-                        update_weather_data(lat, lon, full_loc)
-                        st.success(f"✅ Set to: {full_loc} (Real-time forecast loaded)")
-                    else:
-                        st.error("IP location failed. Please try manual search.")
-                        st.session_state.user_location_accessed = False
-                except requests.exceptions.RequestException as e:
-                    st.error(f"Network error during IP fetch: {e}. Please check your connection or try manual search.")
-                    st.session_state.user_location_accessed = False
-                except Exception as e:
-                    st.error(f"IP detection unavailable: {e}. Please try manual search.")
-                    st.session_state.user_location_accessed = False
+                if st.session_state.get('ip_lookup_failed'):
+                    # terminal state: the polling fragment is no longer rendered, so it stops
+                    st.error("IP location failed. Please try manual search.")
+                    if st.button("Retry IP location", use_container_width=True):
+                        del st.session_state.ip_lookup_failed
+                        st.rerun()
+                else:
+                    if 'ip_lookup' not in st.session_state:
+                        st.session_state.ip_lookup = get_ip_locator().locate_async(client_ip())
+                    ip_location_status()
             elif permission:
                 st.info("✅ Location already fetched. Use search to change.")
             else:
@@ -537,37 +454,82 @@ def main():
        
         theme = st.selectbox("UI Theme", ['Auto', 'Light', 'Dark'], index=0)
         st.session_state.theme = theme.lower()
+        st.checkbox("Lazy tab rendering", key='lazy_tabs', help="Only compute the view you are looking at.")
+       
+        cache_stats = get_response_cache().stats()
+        st.caption(f"🗄️ Shared cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
+        flight_stats = fetch_inflight.stats()
+        st.caption(f"🔗 Coalesced fetches: {flight_stats['shared']} joined / {flight_stats['leaders']} upstream")
+        health = weather_app.health()
+        with st.expander("🩺 Service health"):
+            st.caption(f"Shared app up {health['uptime_s'] / 60:.0f} min • SQLite {'OK' if health['store_ok'] else 'unavailable'} • "
+                       f"OpenWeather key {'set' if health['openweather_key'] else 'missing'}")
+            for name, state in health['llm_providers'].items():
+                st.caption(f"🤖 {name.title()}: {state}")
+            if health['http_hosts']:
+                st.caption("🌐 Pooled hosts: " + ", ".join(health['http_hosts']))
+            prefetch = health['prefetch']
+            st.caption(f"🔄 Prefetch: {prefetch['hot_locations']} hot locations • {prefetch['refreshed']} refreshed • "
+                       f"{prefetch['skipped']} deferred (budget)")
+            for error in health['init_errors']:
+                st.error(error)
+        chart_metrics = get_figure_cache().metrics()
+        if chart_metrics:
+            with st.expander("⏱️ Chart render metrics"):
+                st.dataframe(pd.DataFrame.from_dict(chart_metrics, orient='index').round(1), use_container_width=True)
        
         st.markdown('</div>', unsafe_allow_html=True)
    
-    # Main Tabs - structured navigation
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-        "🌤️ Current Dashboard", "📊 Data Analytics", "🗺️ Interactive Map",
-        "⚡ Advanced Tools", "📝 Summary Review", "🔮 Predictions"
-    ])
-   
-    with tab1:
-        display_dashboard()
-   
-    with tab2:
-        display_analytics()
-   
-    with tab3:
-        display_interactive_map()
-   
-    with tab4:
-        display_advanced_features()
-   
-    with tab5:
-        display_overall_review()
-   
-    with tab6:
-        display_weather_prediction()
+    # Main navigation - lazy mode only runs the selected view; st.tabs executes every tab body
+    views = {
+        "🌤️ Current Dashboard": display_dashboard,
+        "📊 Data Analytics": display_analytics,
+        "🗺️ Interactive Map": display_interactive_map,
+        "⚡ Advanced Tools": display_advanced_features,
+        "📝 Summary Review": display_overall_review,
+        "🔮 Predictions": display_weather_prediction,
+        "🛠️ Admin": display_admin,
+    }
+    if st.session_state.lazy_tabs:
+        active_view = st.radio("View", list(views), horizontal=True, key='active_view', label_visibility='collapsed')
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        views[active_view]()
+        st.caption(f"⚙️ Rendered {active_view} in {(time.perf_counter() - wall_start) * 1000:.0f} ms "
+                   f"(CPU {(time.process_time() - cpu_start) * 1000:.0f} ms)")
+    else:
+        for tab, render in zip(st.tabs(list(views)), views.values()):
+            with tab:
+                render()
+def client_ip():
+    """The browser's address as seen by this server (first X-Forwarded-For hop behind a proxy).
+    None on localhost, where the remote fallback reports this machine's public address instead."""
+    forwarded = st.context.headers.get('X-Forwarded-For')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return st.context.ip_address
+@st.fragment(run_every=1)
+def ip_location_status():
+    """Polls the IP lookup without blocking the sidebar; the local table answers on the first run.
+    Once the lookup finishes a full rerun replaces this fragment, which ends the polling."""
+    lookup = st.session_state.get('ip_lookup')
+    if lookup is None:
+        return
+    if not lookup.done():
+        st.info("🔄 Automatically fetching your location...")
+        return
+    del st.session_state.ip_lookup
+    location = lookup.result()
+    if location is None:
+        st.session_state.ip_lookup_failed = True
+        st.rerun()
+    st.session_state.user_location_accessed = True
+    update_weather_data(location.lat, location.lon, location.label)
 def update_weather_data(lat, lon, location):
     """Update weather data - improved with validation"""
     with st.spinner("Fetching updated weather..."):
         weather_data = weather_app.get_comprehensive_weather(lat, lon)
         if weather_data:
+            get_prefetcher().touch(lat, lon)
             st.session_state.update({
                 'lat': lat, 'lon': lon, 'location': location,
                 'weather_data': weather_data
@@ -583,30 +545,31 @@ def display_dashboard():
         return
    
     data = st.session_state.weather_data
-    current = data['current']
-    unit_symbol = '°C' if st.session_state.unit == 'metric' else '°F'
+    current = data.current
+    unit = st.session_state.unit
+    unit_symbol = temp_symbol(unit)
    
     # Header Row
     col1, col2 = st.columns([2, 1])
     with col1:
-        st.markdown(f'<div class="temp-display">{current["main"]["temp"]:.1f}{unit_symbol}</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="condition-text">{current["weather"][0]["description"].title()}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="temp-display">{convert_temp(current.temp, unit):.1f}{unit_symbol}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="condition-text">{current.description.title()}</div>', unsafe_allow_html=True)
         st.markdown(f'**📍 {st.session_state.location} | Updated: {datetime.now().strftime("%H:%M") }**')
     with col2:
-        weather_icon = current['weather'][0]['icon']
+        weather_icon = current.icon
         icon_url = f"http://openweathermap.org/img/wn/{weather_icon}@4x.png"
         st.image(icon_url, width=150, caption="Weather Icon")
    
     # Metrics Row
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Feels Like", f"{current['main']['feels_like']:.1f}{unit_symbol}")
+        st.metric("Feels Like", f"{convert_temp(current.feels_like, unit):.1f}{unit_symbol}")
     with col2:
-        st.metric("Humidity", f"{current['main']['humidity']}%")
+        st.metric("Humidity", f"{current.humidity}%")
     with col3:
-        st.metric("Wind", f"{current['wind']['speed']:.1f} m/s")
+        st.metric("Wind", f"{convert_speed(current.wind_speed, unit):.1f} {speed_symbol(unit)}")
     with col4:
-        st.metric("Pressure", f"{current['main']['pressure']} hPa")
+        st.metric("Pressure", f"{current.pressure} hPa")
    
     # AI Response - improved
     ai_response = weather_app.ai_assistant.get_response(current)
@@ -617,7 +580,7 @@ def display_dashboard():
     st.markdown('<div class="weather-grid">', unsafe_allow_html=True)
    
     # Air Quality
-    aqi = data['air_quality']['list'][0]['main']['aqi']
+    aqi = data.aqi
     aqi_levels = ['Good', 'Fair', 'Moderate', 'Poor', 'Very Poor']
     aqi_level = aqi_levels[min(aqi-1, 4)]
     st.markdown(f'''
@@ -629,7 +592,7 @@ def display_dashboard():
     ''', unsafe_allow_html=True)
    
     # Pollen
-    pollen = data['pollen']
+    pollen = data.pollen
     st.markdown(f'''
     <div class="weather-item">
         <h4>🌿 Pollen Index</h4>
@@ -638,20 +601,24 @@ def display_dashboard():
     </div>
     ''', unsafe_allow_html=True)
    
-    # UV Index (simulated based on temp/time)
-    uv_index = min(11, max(1, int((current['main']['temp'] / 5) + random.randint(0, 3))))
+    # UV Index from solar elevation and cloud cover, memoized per location and hour
+    exposure = get_exposure_cache().get(st.session_state.lat, st.session_state.lon, current, data.forecast)
+    uv_now = float(uv_index(solar_elevation(st.session_state.lat, st.session_state.lon, current.observed_at), current.clouds))
+    next_day = exposure.head(24)
+    peak = next_day.loc[next_day['uv'].idxmax()]
     st.markdown(f'''
     <div class="weather-item">
         <h4>☀️ UV Index</h4>
-        <div class="temp-display" style="font-size: 2rem;">{uv_index}</div>
-        <p>{'Low' if uv_index < 3 else 'Moderate' if uv_index < 6 else 'High'}</p>
+        <div class="temp-display" style="font-size: 2rem;">{uv_now:.0f}</div>
+        <p>{uv_level(uv_now)}</p>
+        <p>Peak {peak['uv']:.0f} at {peak['time']:%H:%M}</p>
     </div>
     ''', unsafe_allow_html=True)
    
     # Sunrise/Sunset
-    if 'sys' in current:
-        sunrise = datetime.fromtimestamp(current['sys']['sunrise'], tz=timezone.utc).astimezone().strftime('%H:%M')
-        sunset = datetime.fromtimestamp(current['sys']['sunset'], tz=timezone.utc).astimezone().strftime('%H:%M')
+    if current.sunrise and current.sunset:
+        sunrise = datetime.fromtimestamp(current.sunrise, tz=timezone.utc).astimezone().strftime('%H:%M')
+        sunset = datetime.fromtimestamp(current.sunset, tz=timezone.utc).astimezone().strftime('%H:%M')
         st.markdown(f'''
         <div class="weather-item">
             <h4>🌅 Sun Times</h4>
@@ -663,51 +630,54 @@ def display_dashboard():
     st.markdown('</div>', unsafe_allow_html=True)
    
     # Alerts
-    if data['alerts']:
+    if data.alerts:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
         st.markdown('<h4>🚨 Active Alerts</h4>', unsafe_allow_html=True)
-        for alert in data['alerts']:
+        for alert in data.alerts:
             st.warning(alert)
         st.markdown('</div>', unsafe_allow_html=True)
    
+    with st.expander("☀️ Hourly UV & Pollen"):
+        display_exposure(exposure, hours=24)
+   
     # Quick Forecast
-    display_forecast(data['forecast'])
-def display_forecast(forecast_data):
-    """5-day forecast - improved aggregation"""
-    if not forecast_data.get('list'):
+    display_forecast(data.daily)
+def display_exposure(exposure, hours):
+    """UV index and pollen over the next hours from a memoized exposure curve"""
+    window = exposure.head(hours)
+    def build_exposure():
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Bar(x=window['time'], y=window['uv'], name='UV index', marker_color='#ffcc00'), secondary_y=False)
+        for name, color in (('tree', '#4CAF50'), ('grass', '#8BC34A'), ('weed', '#FF9800')):
+            fig.add_trace(go.Scatter(x=window['time'], y=window[name], mode='lines', name=f'{name.title()} pollen', line=dict(color=color)), secondary_y=True)
+        fig.update_layout(title=f'Next {hours} h', template='plotly_dark', height=320)
+        fig.update_yaxes(title_text='UV index', rangemode='tozero', secondary_y=False)
+        fig.update_yaxes(title_text='Pollen /10', range=[0, 10], secondary_y=True)
+        return fig
+    show_chart(f'exposure_{hours}h', (window,), build_exposure)
+def display_forecast(daily):
+    """5-day forecast - reads the precomputed daily summary"""
+    if daily.empty:
         st.info("Forecast unavailable.")
         return
-    unit_symbol = '°C' if st.session_state.unit == 'metric' else '°F'
+    unit = st.session_state.unit
+    unit_symbol = temp_symbol(unit)
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="futuristic-font">📅 5-Day Outlook</h3>', unsafe_allow_html=True)
    
-    # Aggregate daily
-    daily_data = {}
-    for item in forecast_data['list']:
-        dt = datetime.fromtimestamp(item['dt'])
-        date_key = dt.strftime('%Y-%m-%d')
-        if date_key not in daily_data:
-            daily_data[date_key] = {'temps': [], 'icons': [], 'conditions': []}
-        daily_data[date_key]['temps'].append(item['main']['temp'])
-        daily_data[date_key]['icons'].append(item['weather'][0]['icon'])
-        daily_data[date_key]['conditions'].append(item['weather'][0]['description'])
-   
     # Display in columns
+    days = daily.head(5)
+    day_names = days.index.strftime('%a %d')
+    mean_temps = convert_temp(days['mean_temp'], unit)
     cols = st.columns(5)
-    for idx, (date_key, d_data) in enumerate(list(daily_data.items())[:5]):
+    for idx, (day_name, mean_temp, row) in enumerate(zip(day_names, mean_temps, days.itertuples())):
         with cols[idx]:
-            day_dt = datetime.strptime(date_key, '%Y-%m-%d')
-            day_name = day_dt.strftime('%a %d')
-            avg_temp = np.mean(d_data['temps'])
-            main_icon = max(set(d_data['icons']), key=d_data['icons'].count)
-            main_cond = max(set(d_data['conditions']), key=d_data['conditions'].count)
-           
             st.markdown(f'''
             <div class="weather-item">
                 <h5>{day_name}</h5>
-                <img src="http://openweathermap.org/img/wn/{main_icon}.png" width="50">
-                <div style="font-size: 1.5rem; font-weight: bold;">{avg_temp:.1f}{unit_symbol}</div>
-                <p>{main_cond.title()}</p>
+                <img src="http://openweathermap.org/img/wn/{row.icon}.png" width="50">
+                <div style="font-size: 1.5rem; font-weight: bold;">{mean_temp:.1f}{unit_symbol}</div>
+                <p>{row.main_condition.title()}</p>
             </div>
             ''', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
@@ -718,59 +688,98 @@ def display_analytics():
         return
    
     data = st.session_state.weather_data
-    unit_symbol = '°C' if st.session_state.unit == 'metric' else '°F'
+    unit = st.session_state.unit
+    unit_symbol = temp_symbol(unit)
    
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="futuristic-font">📊 Weather Analytics</h3>', unsafe_allow_html=True)
    
     # 24-Hour Trend
-    forecast_items = data['forecast']['list'][:24]
-    if forecast_items:
-        times = [datetime.fromtimestamp(item['dt']).strftime('%H:%M') for item in forecast_items]
-        temps = [item['main']['temp'] for item in forecast_items]
-        hums = [item['main']['humidity'] for item in forecast_items]
+    next_24 = data.forecast.head(24)
+    if not next_24.empty:
+        times = next_24['time'].dt.strftime('%H:%M')
+        temps = convert_temp(next_24['temp'], unit)
+        hums = next_24['humidity']
        
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        fig.add_trace(go.Scatter(x=times, y=temps, mode='lines+markers', name='Temp', line=dict(color='#ff00ff')), secondary_y=False)
-        fig.add_trace(go.Scatter(x=times, y=hums, mode='lines', name='Humidity', line=dict(color='#00ffff')), secondary_y=True)
-        fig.update_layout(title='24-Hour Forecast Trend', xaxis_title='Time', yaxis_title=f'Temp {unit_symbol}', yaxis2_title='Humidity %', template='plotly_dark', height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        def build_trend():
+            fig = make_subplots(specs=[[{"secondary_y": True}]])
+            fig.add_trace(go.Scatter(x=times, y=temps, mode='lines+markers', name='Temp', line=dict(color='#ff00ff')), secondary_y=False)
+            fig.add_trace(go.Scatter(x=times, y=hums, mode='lines', name='Humidity', line=dict(color='#00ffff')), secondary_y=True)
+            fig.update_layout(title='24-Hour Forecast Trend', xaxis_title='Time', yaxis_title=f'Temp {unit_symbol}', yaxis2_title='Humidity %', template='plotly_dark', height=400)
+            return fig
+        show_chart('trend_24h', (times, temps, hums), build_trend)
    
     # 5-Day Bar
-    daily = data.get('daily_forecast', {})
-    if daily:
-        days = sorted(daily.keys())[:5]
-        day_names = [datetime.strptime(d, '%Y-%m-%d').strftime('%a') for d in days]
-        max_t = [daily[d]['max_temp'] for d in days]
-        min_t = [daily[d]['min_temp'] for d in days]
+    daily = data.daily.head(5)
+    if not daily.empty:
+        day_names = daily.index.strftime('%a')
+        max_t = convert_temp(daily['max_temp'], unit)
+        min_t = convert_temp(daily['min_temp'], unit)
        
-        fig_bar = go.Figure()
-        fig_bar.add_trace(go.Bar(x=day_names, y=max_t, name='Max', marker_color='#ff00ff', opacity=0.7))
-        fig_bar.add_trace(go.Bar(x=day_names, y=min_t, name='Min', marker_color='#8000ff', opacity=0.7))
-        fig_bar.update_layout(title=f'5-Day Temps {unit_symbol}', barmode='group', template='plotly_dark', height=400)
-        st.plotly_chart(fig_bar, use_container_width=True)
+        def build_bar():
+            fig_bar = go.Figure()
+            fig_bar.add_trace(go.Bar(x=day_names, y=max_t, name='Max', marker_color='#ff00ff', opacity=0.7))
+            fig_bar.add_trace(go.Bar(x=day_names, y=min_t, name='Min', marker_color='#8000ff', opacity=0.7))
+            fig_bar.update_layout(title=f'5-Day Temps {unit_symbol}', barmode='group', template='plotly_dark', height=400)
+            return fig_bar
+        show_chart('daily_bar', (day_names, max_t, min_t), build_bar)
    
     # Conditions Pie
-    conds = [item['weather'][0]['main'] for item in data['forecast']['list'][:24]]
-    cond_counts = pd.Series(conds).value_counts()
-    fig_pie = px.pie(values=cond_counts.values, names=cond_counts.index, title='24h Conditions')
-    fig_pie.update_layout(template='plotly_dark', height=400)
-    st.plotly_chart(fig_pie, use_container_width=True)
+    if not next_24.empty:
+        cond_counts = next_24['main'].value_counts()
+        cond_counts = cond_counts[cond_counts > 0]
+        def build_pie():
+            fig_pie = px.pie(values=cond_counts.values, names=cond_counts.index.astype(str), title='24h Conditions')
+            fig_pie.update_layout(template='plotly_dark', height=400)
+            return fig_pie
+        show_chart('conditions_pie', (cond_counts.index.astype(str), cond_counts.values), build_pie)
    
     # Radar Metrics
-    metrics = ['Temp', 'Humidity %', 'Wind m/s', 'Pressure hPa', 'Visibility km']
+    metrics = [f'Temp {unit_symbol}', 'Humidity %', f'Wind {speed_symbol(unit)}', 'Pressure hPa', 'Visibility km']
     values = [
-        data['current']['main']['temp'],
-        data['current']['main']['humidity'],
-        data['current']['wind']['speed'],
-        data['current']['main']['pressure'] / 10, # Normalize
-        min(data['current'].get('visibility', 10000) / 1000, 10)
+        convert_temp(data.current.temp, unit),
+        data.current.humidity,
+        convert_speed(data.current.wind_speed, unit),
+        data.current.pressure / 10, # Normalize
+        min(data.current.visibility / 1000, 10)
     ]
-    fig_radar = go.Figure(data=go.Scatterpolar(r=values, theta=metrics, fill='toself', line_color='#ff00ff'))
-    fig_radar.update_layout(polar=dict(radialaxis=dict(range=[0, max(values)*1.1])), title='Weather Metrics Radar', height=400)
-    st.plotly_chart(fig_radar, use_container_width=True)
+    def build_radar():
+        fig_radar = go.Figure(data=go.Scatterpolar(r=values, theta=metrics, fill='toself', line_color='#ff00ff'))
+        fig_radar.update_layout(polar=dict(radialaxis=dict(range=[0, max(values)*1.1])), title='Weather Metrics Radar', height=400)
+        return fig_radar
+    show_chart('metrics_radar', (values,), build_radar)
    
+    display_history(data, unit, unit_symbol)
     st.markdown('</div>', unsafe_allow_html=True)
+def display_history(data, unit, unit_symbol):
+    """Past observations for this location from the local history store - no upstream calls"""
+    st.markdown('#### 📜 Past Days')
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        days = st.selectbox("Range", [1, 3, 7, 30], index=1, format_func=lambda d: f"Last {d} day{'s' if d > 1 else ''}", key='history_days')
+    with col2:
+        step_hours = st.selectbox("Resolution", [1, 3, 6, 24], index=0, format_func=lambda h: f"{h} h", key='history_step')
+    end = int(time.time())
+    history = get_history_store().observations(st.session_state.lat, st.session_state.lon, end - days * 86400, end, step=step_hours * 3600)
+    if history.empty:
+        st.info("No history for this location yet - observations are recorded each time its weather is fetched.")
+        return
+    local_times = history['time'] + pd.Timedelta(seconds=data.current.timezone)
+    temps = convert_temp(history['temp'], unit)
+    def build_history():
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Scatter(x=local_times, y=temps, mode='lines+markers', name='Temp', line=dict(color='#ff00ff')), secondary_y=False)
+        fig.add_trace(go.Scatter(x=local_times, y=history['humidity'], mode='lines', name='Humidity', line=dict(color='#00ffff')), secondary_y=True)
+        fig.update_layout(title=f'Observed - {step_hours} h means', xaxis_title='Local time', yaxis_title=f'Temp {unit_symbol}', yaxis2_title='Humidity %', template='plotly_dark', height=400)
+        return fig
+    show_chart('history', (local_times, temps, history['humidity'], step_hours), build_history)
+    st.caption(f"{len(history)} points • observed range {convert_temp(history['temp'].min(), unit):.1f}–{convert_temp(history['temp'].max(), unit):.1f}{unit_symbol}")
+def show_chart(name, parts, build):
+    """Render a Plotly figure, reusing the cached build while its inputs, unit and theme are unchanged"""
+    charts = get_figure_cache()
+    fig = charts.get_or_build(name, (*parts, st.session_state.unit, st.session_state.theme), build)
+    with charts.timed_render(name):
+        st.plotly_chart(fig, use_container_width=True)
 def display_interactive_map():
     """Map display"""
     if not st.session_state.weather_data:
@@ -780,8 +789,15 @@ def display_interactive_map():
     st.markdown('<div class="glass-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="futuristic-font">🗺️ Weather Map</h3>', unsafe_allow_html=True)
    
-    m = weather_app.create_weather_map(st.session_state.lat, st.session_state.lon, st.session_state.weather_data)
-    st_folium(m, width='100%', height=500)
+    lat, lon = st.session_state.lat, st.session_state.lon
+    current = st.session_state.weather_data.current
+    charts = get_figure_cache()
+    m = charts.get_or_build(
+        'weather_map', (lat, lon, current.temp, current.description, current.condition, st.session_state.unit),
+        lambda: weather_app.create_weather_map(lat, lon, st.session_state.weather_data)
+    )
+    with charts.timed_render('weather_map'):
+        st_folium(m, width='100%', height=500)
     st.markdown('</div>', unsafe_allow_html=True)
 def display_advanced_features():
     """Advanced tools - fixed favorites load, improved UI with cards and scroll"""
@@ -812,7 +828,7 @@ def display_advanced_features():
     with st.expander("🌿 Detailed Pollen Forecast", expanded=st.session_state.weather_data is not None):
         if st.session_state.weather_data:
             st.markdown('<div class="tool-card">', unsafe_allow_html=True)
-            pollen = st.session_state.weather_data['pollen']
+            pollen = st.session_state.weather_data.pollen
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.markdown('<div class="pollen-detail">', unsafe_allow_html=True)
@@ -851,29 +867,31 @@ def display_advanced_features():
         st.markdown('<div class="tool-card">', unsafe_allow_html=True)
         if st.session_state.weather_data:
             if st.button("➕ Add Current Location", use_container_width=True):
-                if st.session_state.location not in st.session_state.favorites:
-                    st.session_state.favorites.append(st.session_state.location)
+                if all(fav['name'] != st.session_state.location for fav in st.session_state.favorites):
+                    st.session_state.favorites.append({'name': st.session_state.location, 'lat': st.session_state.lat, 'lon': st.session_state.lon})
+                    get_store().add_favorite(st.session_state.user_id, st.session_state.location, st.session_state.lat, st.session_state.lon)
                     st.success("✅ Added to favorites!")
                     st.rerun()
                 else:
                     st.warning("Already in favorites!")
         
         if st.session_state.favorites:
+            display_favorites_overview()
             st.markdown('<div class="favorites-list">', unsafe_allow_html=True)
             for i, fav in enumerate(st.session_state.favorites):
                 col1, col2, col3 = st.columns([3, 1, 1])
                 with col1:
-                    st.write(f"📍 {fav}")
+                    st.write(f"📍 {fav['name']}")
                 with col2:
                     if st.button("Load", key=f"load_{i}"):
-                        lat, lon, _ = weather_app.get_lat_lon_from_location(fav)
-                        if lat and lon:
-                            update_weather_data(lat, lon, fav)
+                        if fav['lat'] is not None:
+                            update_weather_data(fav['lat'], fav['lon'], fav['name'])
                         else:
                             st.error("Could not geocode favorite.")
                 with col3:
                     if st.button("❌", key=f"del_{i}"):
                         st.session_state.favorites.pop(i)
+                        get_store().remove_favorite(st.session_state.user_id, fav['name'])
                         st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
         else:
@@ -881,15 +899,77 @@ def display_advanced_features():
         st.markdown('</div>', unsafe_allow_html=True)
    
     st.markdown('</div>', unsafe_allow_html=True)
+def resolve_favorite_coords(favorites):
+    """Favorites saved before coordinates were stored get geocoded once and written back"""
+    for fav in favorites:
+        if fav['lat'] is None:
+            lat, lon, _ = weather_app.get_lat_lon_from_location(fav['name'])
+            if lat is not None and lon is not None:
+                fav['lat'], fav['lon'] = lat, lon
+                get_store().update_favorite_coords(st.session_state.user_id, fav['name'], lat, lon)
+    return [fav for fav in favorites if fav['lat'] is not None]
+def display_favorites_overview():
+    """Current conditions for every favorite in one batched, cached and rate-limited fetch.
+    Listing a favorite doesn't mark it hot for the prefetcher - loading it does, via update_weather_data."""
+    favorites = resolve_favorite_coords(st.session_state.favorites)
+    if not weather_app.get_api_key('openweather') or not favorites:
+        return
+    currents = weather_app.service.get_current_batch([(fav['lat'], fav['lon']) for fav in favorites])
+    unit = st.session_state.unit
+    rows = []
+    for fav, current in zip(favorites, currents):
+        if current is not None:
+            rows.append({'Location': fav['name'], f'Temp ({temp_symbol(unit)})': round(convert_temp(current.temp, unit), 1),
+                         'Condition': current.description.title(), 'Humidity (%)': current.humidity})
+        else:
+            rows.append({'Location': fav['name'], f'Temp ({temp_symbol(unit)})': None, 'Condition': 'Unavailable', 'Humidity (%)': None})
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+def display_admin():
+    """Upstream latency, outcomes and cache hit rates from the process-wide metrics registry"""
+    st.markdown('<h3 class="futuristic-font neon-text">🛠️ Service Metrics</h3>', unsafe_allow_html=True)
+    st.caption("Process-wide since start, shared by all sessions. Scrape GET /metrics on server.py for Prometheus.")
+    latency = pd.DataFrame(REGISTRY.latency_summary())
+    if latency.empty:
+        st.info("No calls recorded yet.")
+    else:
+        st.markdown("#### ⏱️ Latency")
+        for name, group in latency.groupby('metric', sort=False):
+            st.caption(name)
+            st.dataframe(group.dropna(axis=1, how='all').drop(columns='metric').round(1), hide_index=True, use_container_width=True)
+    outcomes = UPSTREAM_REQUESTS.samples()
+    if outcomes:
+        st.markdown("#### 📡 Upstream calls by status")
+        calls = pd.DataFrame([{**labels, 'calls': value} for labels, value in outcomes])
+        st.dataframe(calls.pivot_table(index=['service', 'endpoint'], columns='status', values='calls', fill_value=0),
+                     use_container_width=True)
+        volume = pd.DataFrame([{**labels, 'KiB': value / 1024} for labels, value in UPSTREAM_BYTES.samples()])
+        retries = pd.DataFrame([{**labels, 'retries': value} for labels, value in UPSTREAM_RETRIES.samples()])
+        col1, col2 = st.columns(2)
+        with col1:
+            if not volume.empty:
+                st.dataframe(volume.round(1), hide_index=True, use_container_width=True)
+        with col2:
+            if not retries.empty:
+                st.dataframe(retries, hide_index=True, use_container_width=True)
+    cache_stats = get_response_cache().stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Response cache hit rate", f"{cache_stats['hit_rate']:.0%}", f"{cache_stats['hits']} hits / {cache_stats['misses']} misses", delta_color='off')
+    insight_stats = get_insight_cache().stats()
+    insight_lookups = insight_stats['hits'] + insight_stats['stale_hits'] + insight_stats['misses']
+    col2.metric("AI insight cache hit rate", f"{(insight_stats['hits'] + insight_stats['stale_hits']) / insight_lookups:.0%}" if insight_lookups else "–")
+    flight_stats = fetch_inflight.stats()
+    col3.metric("Coalesced fetches", flight_stats['shared'], f"{flight_stats['leaders']} upstream", delta_color='off')
+    with st.expander("Prometheus exposition"):
+        st.code(REGISTRY.render(), language='text')
 def display_overall_review():
     """Structured review"""
     if not st.session_state.weather_data:
         st.warning("Load data.")
         return
    
-    unit_symbol = '°C' if st.session_state.unit == 'metric' else '°F'
+    unit = st.session_state.unit
     data = st.session_state.weather_data
-    current = data['current']
+    current = data.current
    
     st.markdown('<div class="glass-card glow-effect">', unsafe_allow_html=True)
     st.markdown('<h3 class="neon-text">📝 Weather Summary</h3>', unsafe_allow_html=True)
@@ -902,18 +982,92 @@ def display_overall_review():
     """)
    
     col1, col2, col3, col4 = st.columns(4)
-    with col1: st.metric("Temp", f"{current['main']['temp']}{unit_symbol}")
-    with col2: st.metric("AQI", data['air_quality']['list'][0]['main']['aqi'])
-    with col3: st.metric("Pollen", f"{data['pollen']['overall']}/10")
-    with col4: st.metric("Alerts", len(data['alerts']))
+    with col1: st.metric("Temp", f"{convert_temp(current.temp, unit):.1f}{temp_symbol(unit)}")
+    with col2: st.metric("AQI", data.aqi)
+    with col3: st.metric("Pollen", f"{data.pollen['overall']}/10")
+    with col4: st.metric("Alerts", len(data.alerts))
    
     # AI Summary
     if st.button("Get AI Review"):
-        prompt = f"Summarize weather in {st.session_state.location}: {current['weather'][0]['description']}, {current['main']['temp']}°C. Include pros/cons and advice."
-        summary = weather_app.get_ai_insight(prompt)
-        st.markdown(f"**AI Review:** {summary}")
+        prompt = f"Summarize weather in {st.session_state.location}: {current.description}, {current.temp}°C. Include pros/cons and advice."
+        st.markdown("**AI Review:**")
+        timing = {}
+        st.write_stream(weather_app.get_ai_insight_stream(prompt, timing))
+        display_llm_latency(timing)
    
     st.markdown('</div>', unsafe_allow_html=True)
+def display_llm_latency(timing):
+    """Caption with time-to-first-token and total latency of a streamed answer, plus per-provider averages"""
+    if timing:
+        st.caption(f"⏱️ {timing['provider']}: first token {timing['ttft_ms']:.0f} ms • total {timing['total_ms'] / 1000:.1f} s")
+    averages = weather_app.llm.latency.summary()
+    if averages:
+        st.caption(" | ".join(
+            f"{name.title()} avg: TTFT {stats['avg_ttft_ms']:.0f} ms, total {stats['avg_total_ms'] / 1000:.1f} s ({stats['calls']} calls)"
+            for name, stats in averages.items()
+        ))
+def display_forecast_accuracy(unit, unit_symbol):
+    """Confidence from how past forecasts for this location verified - running totals, no history scan"""
+    tracker = get_accuracy_tracker()
+    lat, lon = st.session_state.lat, st.session_state.lon
+    summary = tracker.summary(lat, lon, max_lead=86400)
+    if summary is None:
+        st.metric("Confidence", "—", help="Forecasts are scored as later observations arrive; check back after a few refreshes.")
+        st.caption("Collecting data: no forecast has been verified against an observation yet.")
+        return
+    scale = 9 / 5 if unit == 'imperial' else 1 # temperature differences, not absolute temperatures
+    scope = "this location" if summary['scope'] == 'location' else "all locations (too few samples here yet)"
+    st.metric("Confidence", f"{summary['hit_rate'] * 100:.0f}%",
+              help=f"Share of next-24 h temperature forecasts that landed within ±{HIT_TOLERANCE * scale:.0f}{unit_symbol} of the observation.")
+    st.caption(f"Next 24 h: mean error ±{summary['mae'] * scale:.1f}{unit_symbol}, bias {summary['bias'] * scale:+.1f}{unit_symbol} "
+               f"over {summary['count']} verified forecasts for {scope}")
+    rows = tracker.by_lead_day(lat, lon)
+    if rows:
+        with st.expander("Accuracy by lead time"):
+            st.dataframe(pd.DataFrame({
+                'Lead': [f"Day {row['lead_day']}" for row in rows],
+                'Samples': [row['count'] for row in rows],
+                'MAE': [f"{row['mae'] * scale:.1f}{unit_symbol}" for row in rows],
+                'Bias': [f"{row['bias'] * scale:+.1f}{unit_symbol}" for row in rows],
+                'Within tolerance': [f"{row['hit_rate'] * 100:.0f}%" for row in rows],
+            }), use_container_width=True, hide_index=True)
+def display_nowcast(data, unit, unit_symbol):
+    """7-day temperature outlook: the provider forecast extended by the local Holt-Winters model"""
+    st.markdown("### 📐 7-Day Outlook")
+    lat, lon = st.session_state.lat, st.session_state.lon
+    end = int(time.time())
+    history = get_history_store().observations(lat, lon, end - MAX_HISTORY_DAYS * 86400, end)
+    # measured day-5 error, as a normal sigma (MAE ≈ 0.8 sigma), floors the interval width
+    day5 = [row for row in get_accuracy_tracker().by_lead_day(lat, lon) if row['lead_day'] == 5]
+    min_sigma = day5[0]['mae'] * 1.25 if day5 else 0.0
+    start = time.perf_counter()
+    frame = nowcast(data.forecast, data.current.timezone, history, min_sigma=min_sigma)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if frame is None:
+        st.info("Not enough forecast steps for an outlook.")
+        return
+    frame = frame.assign(temp=convert_temp(frame['temp'], unit), lower=convert_temp(frame['lower'], unit),
+                         upper=convert_temp(frame['upper'], unit))
+    def build_outlook():
+        extension = frame[frame['source'] == 'nowcast']
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=extension['time'], y=extension['upper'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=extension['time'], y=extension['lower'], mode='lines', line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(0,255,255,0.2)', name='80% interval'))
+        fig.add_trace(go.Scatter(x=frame['time'], y=frame['temp'].where(frame['source'] == 'forecast'), mode='lines', name='Forecast', line=dict(color='#ff00ff')))
+        fig.add_trace(go.Scatter(x=extension['time'], y=extension['temp'], mode='lines', name='Local model', line=dict(color='#00ffff', dash='dash')))
+        fig.update_layout(title=f'Temperature {unit_symbol}', template='plotly_dark', height=350)
+        return fig
+    show_chart('nowcast', (frame['time'], frame['temp'], frame['lower'], frame['upper']), build_outlook)
+    outlook = daily_outlook(frame)
+    st.dataframe(pd.DataFrame({
+        'Date': outlook.index.strftime('%a %d'),
+        'High': outlook['high'].map(lambda t: f"{t:.1f}{unit_symbol}").to_numpy(),
+        'Low': outlook['low'].map(lambda t: f"{t:.1f}{unit_symbol}").to_numpy(),
+        '80% range': outlook['spread'].map(lambda s: '' if pd.isna(s) else f"±{s:.1f}{unit_symbol}").to_numpy(),
+        'Source': np.where(outlook['source'] == 'nowcast', 'Local model', 'OpenWeather'),
+    }), use_container_width=True, hide_index=True)
+    st.caption(f"Computed locally in {elapsed_ms:.1f} ms from the 5-day forecast and {len(history)} stored observations.")
 def display_weather_prediction():
     """Structured predictions"""
     if not st.session_state.weather_data:
@@ -921,70 +1075,76 @@ def display_weather_prediction():
         return
    
     data = st.session_state.weather_data
-    unit_symbol = '°C' if st.session_state.unit == 'metric' else '°F'
+    unit = st.session_state.unit
+    unit_symbol = temp_symbol(unit)
    
     st.markdown('<div class="glass-card glow-effect">', unsafe_allow_html=True)
     st.markdown('<h3 class="neon-text futuristic-font">🔮 Detailed Predictions</h3>', unsafe_allow_html=True)
    
     # Hourly
     st.markdown("### ⏰ Next 8 Hours")
-    forecast_list = data['forecast']['list']
-    if forecast_list:
-        hourly = forecast_list[:8]
-        times = [datetime.fromtimestamp(item['dt']).strftime('%H:%M') for item in hourly]
-        temps = [item['main']['temp'] for item in hourly]
+    frame = data.forecast
+    if not frame.empty:
+        hourly = frame.head(8)
+        times = hourly['time'].dt.strftime('%H:%M')
+        temps = convert_temp(hourly['temp'], unit)
        
-        fig_h = go.Figure(go.Scatter(x=times, y=temps, mode='lines+markers', line_color='#ff00ff'))
-        fig_h.update_layout(title=f'Hourly Temps {unit_symbol}', template='plotly_dark', height=300)
-        st.plotly_chart(fig_h, use_container_width=True)
+        def build_hourly():
+            fig_h = go.Figure(go.Scatter(x=times, y=temps, mode='lines+markers', line_color='#ff00ff'))
+            fig_h.update_layout(title=f'Hourly Temps {unit_symbol}', template='plotly_dark', height=300)
+            return fig_h
+        show_chart('hourly_8h', (times, temps), build_hourly)
        
         hourly_df = pd.DataFrame({
             'Time': times,
-            'Temp': [f"{t:.1f}{unit_symbol}" for t in temps],
-            'Cond': [item['weather'][0]['description'].title() for item in hourly],
-            'Pop %': [f"{item.get('pop', 0)*100:.0f}" for item in hourly]
-        })
+            'Temp': temps.map(lambda t: f"{t:.1f}{unit_symbol}"),
+            'Cond': hourly['description'].astype(str).str.title(),
+            'Pop %': (hourly['pop'] * 100).round().astype(int).astype(str)
+        }).reset_index(drop=True)
         st.dataframe(hourly_df, use_container_width=True)
    
     # Daily
     st.markdown("### 📅 Next 5 Days")
-    daily = data.get('daily_forecast', {})
-    if daily:
-        days = sorted(daily.keys())[:5]
+    daily = data.daily.head(5)
+    if not daily.empty:
         daily_df = pd.DataFrame({
-            'Date': [datetime.strptime(d, '%Y-%m-%d').strftime('%a %d') for d in days],
-            'High': [f"{daily[d]['max_temp']:.1f}{unit_symbol}" for d in days],
-            'Low': [f"{daily[d]['min_temp']:.1f}{unit_symbol}" for d in days],
-            'Cond': [daily[d]['main_condition'].title() for d in days],
-            'Rain %': [f"{daily[d]['avg_pop']*100:.0f}%" for d in days]
-        })
+            'Date': daily.index.strftime('%a %d'),
+            'High': convert_temp(daily['max_temp'], unit).map(lambda t: f"{t:.1f}{unit_symbol}"),
+            'Low': convert_temp(daily['min_temp'], unit).map(lambda t: f"{t:.1f}{unit_symbol}"),
+            'Cond': daily['main_condition'].str.title(),
+            'Rain %': (daily['avg_pop'] * 100).round().astype(int).astype(str) + '%'
+        }).reset_index(drop=True)
         st.dataframe(daily_df, use_container_width=True)
    
+    display_nowcast(data, unit, unit_symbol)
+   
+    st.markdown("### ☀️ UV & Pollen - Next 48 Hours")
+    display_exposure(get_exposure_cache().get(st.session_state.lat, st.session_state.lon, data.current, data.forecast), hours=48)
+   
     # AI Prediction
     st.markdown("### 🧠 AI 7-Day Forecast")
     if st.button("Generate Prediction", use_container_width=True):
-        with st.spinner("AI thinking..."):
-            temp_c = data['current']['main']['temp'] if st.session_state.unit == 'metric' else (data['current']['main']['temp'] - 32) * 5 / 9
-            prompt = f"Predict 7-day weather for {st.session_state.location}. Current: {temp_c:.1f}°C, {data['current']['weather'][0]['description']}. Structure: **Day N:** High/Low, cond, precip %, advice. Engaging & accurate."
-            pred = weather_app.get_ai_insight(prompt)
-            st.markdown(pred)
+        prompt = f"Predict 7-day weather for {st.session_state.location}. Current: {data.current.temp:.1f}°C, {data.current.description}. Structure: **Day N:** High/Low, cond, precip %, advice. Engaging & accurate."
+        timing = {}
+        st.write_stream(weather_app.get_ai_insight_stream(prompt, timing))
+        display_llm_latency(timing)
    
     # Trends
     st.markdown("### 📈 Trends & Confidence")
-    if forecast_list:
-        conf = round(random.uniform(0.9, 0.99), 2)
-        st.metric("Confidence", f"{conf*100}%")
+    if not frame.empty:
+        display_forecast_accuracy(unit, unit_symbol)
        
-        avg_next_temp = np.mean([item['main']['temp'] for item in forecast_list[:8]])
-        curr_temp = data['current']['main']['temp']
+        next_24 = frame.head(24)
+        avg_next_temp = float(frame['temp'].head(8).mean())
+        curr_temp = data.current.temp
         trend = "↑ Warming" if avg_next_temp > curr_temp + 1 else "→ Stable" if abs(avg_next_temp - curr_temp) < 1 else "↓ Cooling"
-        precip_risk = np.mean([item.get('pop', 0) for item in forecast_list[:24]]) * 100
-        max_wind = max([item['wind'].get('speed', 0) for item in forecast_list[:24]])
+        precip_risk = float(next_24['pop'].mean()) * 100
+        max_wind = convert_speed(float(next_24['wind_speed'].max()), unit)
        
         col1, col2, col3 = st.columns(3)
         with col1: st.metric("Temp Trend", trend)
         with col2: st.metric("Precip Risk", f"{precip_risk:.0f}%")
-        with col3: st.metric("Max Wind", f"{max_wind:.1f} m/s")
+        with col3: st.metric("Max Wind", f"{max_wind:.1f} {speed_symbol(unit)}")
    
     st.markdown('</div>', unsafe_allow_html=True)
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+# benchmarks/bench_fetch.py
+"""Sequential vs concurrent OpenWeather fetch against a local fake server.
+
+Usage: python benchmarks/bench_fetch.py [--delay 0.2] [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fetcher import ENDPOINTS, fetch_endpoint, fetch_weather_bundle
+from weather_cache import ResponseCache
+
+FAKE_PAYLOADS = {
+    ENDPOINTS['current']: {
+        'cod': 200, 'name': 'Fake City', 'dt': 1700000000,
+        'main': {'temp': 21.5, 'feels_like': 21.0, 'humidity': 55, 'pressure': 1013},
+        'weather': [{'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+        'wind': {'speed': 3.2}, 'sys': {'sunrise': 1699990000, 'sunset': 1700030000},
+    },
+    ENDPOINTS['forecast']: {
+        'cod': "200",
+        'list': [
+            {'dt': 1700000000 + i * 10800,
+             'main': {'temp': 20 + (i % 8), 'humidity': 50 + (i % 5)},
+             'weather': [{'main': 'Clouds', 'description': 'few clouds', 'icon': '02d'}],
+             'wind': {'speed': 2.5}, 'pop': 0.1}
+            for i in range(40)
+        ],
+    },
+    ENDPOINTS['air_quality']: {'cod': 200, 'list': [{'main': {'aqi': 2}}]},
+}
+BENCH_CACHE = ResponseCache()
+def make_handler(delay):
+    class FakeOpenWeatherHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(delay)
+            payload = FAKE_PAYLOADS.get(urlparse(self.path).path)
+            body = json.dumps(payload or {'cod': 404, 'message': 'not found'}).encode()
+            self.send_response(200 if payload else 404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return FakeOpenWeatherHandler
+def sequential(base_url):
+    return {endpoint: fetch_endpoint(endpoint, 40.7, -74.0, "fake", base_url=base_url) for endpoint in ENDPOINTS}
+def concurrent(base_url):
+    return fetch_weather_bundle(40.7, -74.0, "fake", base_url=base_url)
+def cached(base_url):
+    # First run populates the cache, the rest are served from memory
+    return fetch_weather_bundle(40.7, -74.0, "fake", base_url=base_url, cache=BENCH_CACHE)
+def timed(fn, base_url, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        results = fn(base_url)
+        samples.append(time.perf_counter() - start)
+        assert all(r.status_code == 200 for r in results.values()), results
+    return samples
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.2, help="simulated upstream latency per call (s)")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for name, fn in (("sequential", sequential), ("concurrent", concurrent), ("cached", cached)):
+            samples = timed(fn, base_url, args.runs)
+            print(f"{name:<11} mean={statistics.mean(samples)*1000:7.1f} ms  "
+                  f"p50={statistics.median(samples)*1000:7.1f} ms  max={max(samples)*1000:7.1f} ms")
+    finally:
+        server.shutdown()
+if __name__ == "__main__":
+    main()
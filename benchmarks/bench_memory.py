@@ -0,0 +1,98 @@
+# benchmarks/bench_memory.py
+"""Bytes per session: raw OpenWeather JSON bundle vs the compact WeatherSnapshot model.
+
+Usage: python benchmarks/bench_memory.py [--sessions 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecast_frame import build_forecast_frame, daily_summary
+from models import CurrentConditions, WeatherSnapshot
+
+CONDITIONS = [('Clear', 'clear sky', '01d'), ('Clouds', 'scattered clouds', '03d'), ('Rain', 'light rain', '10d')]
+def realistic_payloads(seed=0):
+    """JSON text shaped like real /weather, /forecast and /air_pollution responses"""
+    rng = np.random.default_rng(seed)
+    def main_block(temp):
+        return {'temp': temp, 'feels_like': temp - 1.2, 'temp_min': temp - 2, 'temp_max': temp + 2,
+                'pressure': 1013, 'sea_level': 1013, 'grnd_level': 1008, 'humidity': int(rng.integers(30, 95)), 'temp_kf': 0}
+    def weather_block(i):
+        cond = CONDITIONS[i % len(CONDITIONS)]
+        return [{'id': 800 + i % 4, 'main': cond[0], 'description': cond[1], 'icon': cond[2]}]
+    current = {
+        'coord': {'lon': -74.006, 'lat': 40.7128}, 'weather': weather_block(0), 'base': 'stations',
+        'main': main_block(21.4), 'visibility': 10000, 'wind': {'speed': 3.6, 'deg': 220, 'gust': 5.1},
+        'clouds': {'all': 20}, 'dt': 1700000000, 'sys': {'type': 2, 'id': 2039034, 'country': 'US', 'sunrise': 1699990000, 'sunset': 1700030000},
+        'timezone': -18000, 'id': 5128581, 'name': 'New York', 'cod': 200,
+    }
+    forecast = {'cod': '200', 'message': 0, 'cnt': 40, 'list': [
+        {'dt': 1700000000 + i * 10800, 'main': main_block(float(18 + 5 * np.sin(i / 8 * 2 * np.pi))),
+         'weather': weather_block(i), 'clouds': {'all': int(rng.integers(0, 100))},
+         'wind': {'speed': float(rng.uniform(0, 10)), 'deg': int(rng.integers(0, 360)), 'gust': float(rng.uniform(0, 15))},
+         'visibility': 10000, 'pop': float(rng.uniform(0, 1)), 'sys': {'pod': 'd'},
+         'dt_txt': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1700000000 + i * 10800))}
+        for i in range(40)
+    ], 'city': {'id': 5128581, 'name': 'New York', 'coord': {'lat': 40.7128, 'lon': -74.006}, 'country': 'US',
+                'population': 8175133, 'timezone': -18000, 'sunrise': 1699990000, 'sunset': 1700030000}}
+    air = {'coord': {'lon': -74.006, 'lat': 40.7128}, 'list': [{'main': {'aqi': 2}, 'components': {
+        'co': 230.3, 'no': 0.1, 'no2': 12.3, 'o3': 50.1, 'so2': 2.1, 'pm2_5': 5.6, 'pm10': 8.2, 'nh3': 0.7}, 'dt': 1700000000}]}
+    return json.dumps(current), json.dumps(forecast), json.dumps(air)
+def deep_sizeof(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True, index=True).sum() if isinstance(obj, pd.DataFrame) else obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+def raw_session(texts):
+    """The original session payload: parsed JSON plus a per-day dict of lists"""
+    current, forecast, air = (json.loads(text) for text in texts)
+    daily = {}
+    for item in forecast['list']:
+        date_key = time.strftime('%Y-%m-%d', time.gmtime(item['dt']))
+        daily.setdefault(date_key, {'temps': [], 'conditions': [], 'pop': []})
+        daily[date_key]['temps'].append(item['main']['temp'])
+        daily[date_key]['conditions'].append(item['weather'][0]['description'])
+        daily[date_key]['pop'].append(item.get('pop', 0))
+    return {'current': current, 'forecast': forecast, 'daily_forecast': daily, 'air_quality': air,
+            'pollen': {'tree': 1.0, 'grass': 1.0, 'weed': 0.0, 'overall': 0.7}, 'alerts': []}
+def compact_session(texts):
+    current, forecast, air = (json.loads(text) for text in texts)
+    frame = build_forecast_frame(forecast)
+    return WeatherSnapshot(
+        current=CurrentConditions.from_payload(current), forecast=frame, daily=daily_summary(frame),
+        aqi=air['list'][0]['main']['aqi'], pollen={'tree': 1.0, 'grass': 1.0, 'weed': 0.0, 'overall': 0.7}, alerts=(),
+    )
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = realistic_payloads()
+    for name, build in (("raw JSON", raw_session), ("compact", compact_session)):
+        start = time.perf_counter()
+        sessions = [build(texts) for _ in range(args.sessions)]
+        elapsed = (time.perf_counter() - start) / args.sessions
+        per_session = deep_sizeof(sessions[0])
+        total = deep_sizeof(sessions) # shared interned strings are counted once here
+        print(f"{name:<9} {per_session/1024:7.1f} KiB/session (isolated)  "
+              f"{total/1024/args.sessions:7.1f} KiB/session over {args.sessions}  build {elapsed*1000:6.2f} ms")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_nowcast.py
+"""Local Holt-Winters nowcast vs the LLM prediction path: latency and accuracy on a rolling backtest.
+
+Each origin fits on everything before it and predicts the next --horizon 3-hourly temperatures. The series is
+a location's stored history (--lat/--lon, downsampled to 3 h) or, by default, a synthetic daily cycle with
+fronts and noise. Same-time-yesterday persistence is the baseline. The LLM path is only run with --llm and
+a GROQ_API_KEY or ANTHROPIC_API_KEY; it gets the last five days as text and must answer with numbers.
+
+Usage: python benchmarks/bench_nowcast.py [--days 14] [--horizon 16] [--lat 40.71 --lon -74.01] [--llm]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nowcast import SEASON, STEP, Z_SCORES, fit_holt_winters, forecast_holt_winters
+
+TRAIN_DAYS = 5
+LLM_PROMPT = ("Here are 3-hourly air temperatures in °C, oldest first: {series}. "
+              "Predict the next {horizon} 3-hourly temperatures. Reply with exactly {horizon} comma-separated numbers and nothing else.")
+def synthetic_series(days, seed=0):
+    """Daily cycle whose mean wanders with passing fronts, plus observation noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days * SEASON)
+    fronts = np.cumsum(rng.normal(0, 0.35, len(t)))
+    return 15 + fronts + 5 * np.sin((t - 3) / SEASON * 2 * np.pi) + rng.normal(0, 0.6, len(t))
+def history_series(lat, lon, days):
+    from history_store import get_history_store
+    end = int(time.time())
+    frame = get_history_store().observations(lat, lon, end - days * 86400, end, step=STEP)
+    return frame['temp'].interpolate().to_numpy(dtype='float64')
+def run_nowcast(train, horizon):
+    start = time.perf_counter()
+    mean, lower, upper = forecast_holt_winters(fit_holt_winters(train), horizon, Z_SCORES[0.8])
+    return mean, lower, upper, time.perf_counter() - start
+def make_llm():
+    from dotenv import load_dotenv
+    from lazy_import import module_available
+    from llm import AnthropicProvider, GroqProvider, LLMRouter
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+    providers = []
+    if os.getenv('GROQ_API_KEY') and module_available('groq'):
+        from groq import Groq
+        providers.append(GroqProvider(Groq(api_key=os.getenv('GROQ_API_KEY').strip('"\' '))))
+    if os.getenv('ANTHROPIC_API_KEY') and module_available('anthropic'):
+        from anthropic import Anthropic
+        providers.append(AnthropicProvider(Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))))
+    return LLMRouter(providers) if providers else None
+def run_llm(router, train, horizon):
+    recent = ", ".join(f"{value:.1f}" for value in train[-TRAIN_DAYS * SEASON:])
+    start = time.perf_counter()
+    text = router.complete(LLM_PROMPT.format(series=recent, horizon=horizon))
+    elapsed = time.perf_counter() - start
+    numbers = [float(value) for value in re.findall(r"-?\d+(?:\.\d+)?", text)][:horizon]
+    return (np.array(numbers) if len(numbers) == horizon else None), elapsed
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=14, help="series length (synthetic) or history window")
+    parser.add_argument("--horizon", type=int, default=2 * SEASON, help="3-hourly steps predicted per origin")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lon", type=float)
+    parser.add_argument("--llm", action="store_true", help="also time the LLM path (needs an API key)")
+    parser.add_argument("--llm-origins", type=int, default=3, help="origins sent to the LLM, from the most recent")
+    args = parser.parse_args()
+
+    series = history_series(args.lat, args.lon, args.days) if args.lat is not None else synthetic_series(args.days)
+    origins = list(range(TRAIN_DAYS * SEASON, len(series) - args.horizon + 1, SEASON // 2))
+    if not origins:
+        sys.exit(f"series has {len(series)} points; need at least {TRAIN_DAYS * SEASON + args.horizon}")
+
+    latencies, model_errors, persistence_errors, covered = [], [], [], []
+    for origin in origins:
+        train, actual = series[:origin], series[origin:origin + args.horizon]
+        mean, lower, upper, elapsed = run_nowcast(train, args.horizon)
+        latencies.append(elapsed)
+        model_errors.append(np.abs(mean - actual).mean())
+        covered.append(((actual >= lower) & (actual <= upper)).mean())
+        yesterday = np.resize(train[-SEASON:], args.horizon)
+        persistence_errors.append(np.abs(yesterday - actual).mean())
+
+    print(f"{len(series)} points, {len(origins)} origins, horizon {args.horizon} steps ({args.horizon * 3} h)\n")
+    print(f"{'method':<14}{'median ms':>10}{'p95 ms':>10}{'MAE °C':>9}{'80% PI cover':>14}")
+    ms = sorted(value * 1000 for value in latencies)
+    print(f"{'holt-winters':<14}{statistics.median(ms):>10.2f}{ms[int(0.95 * (len(ms) - 1))]:>10.2f}"
+          f"{statistics.mean(model_errors):>9.2f}{statistics.mean(covered):>13.0%}")
+    print(f"{'persistence':<14}{'-':>10}{'-':>10}{statistics.mean(persistence_errors):>9.2f}{'-':>14}")
+
+    if args.llm:
+        router = make_llm()
+        if router is None:
+            print("\nllm: skipped - no GROQ_API_KEY or ANTHROPIC_API_KEY with its SDK installed")
+            return
+        llm_latencies, llm_errors, failed = [], [], 0
+        for origin in origins[-args.llm_origins:]:
+            predicted, elapsed = run_llm(router, series[:origin], args.horizon)
+            llm_latencies.append(elapsed * 1000)
+            if predicted is None:
+                failed += 1
+            else:
+                llm_errors.append(np.abs(predicted - series[origin:origin + args.horizon]).mean())
+        router.close()
+        mae = f"{statistics.mean(llm_errors):>9.2f}" if llm_errors else f"{'-':>9}"
+        print(f"{'llm':<14}{statistics.median(llm_latencies):>10.0f}{max(llm_latencies):>10.0f}{mae}{'-':>14}"
+              f"   ({len(llm_latencies)} origins, {failed} unparseable)")
+if __name__ == "__main__":
+    main()
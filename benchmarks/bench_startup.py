@@ -0,0 +1,92 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of app.py: time to first render and what gets imported on the way, via python -X importtime.
+
+Each run is a fresh interpreter that imports the Streamlit test harness, then renders app.py once
+(no location loaded, like a new visitor). Only imports after the harness is ready are attributed to the app.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 15] [--history startup_history.csv]
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = "--- app start ---"
+PROBE = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at = AppTest.from_file({os.path.join(ROOT, 'app.py')!r}, default_timeout=120).run()
+print(json.dumps({{'first_render_ms': (time.perf_counter() - start) * 1000, 'exceptions': len(at.exception)}}))
+"""
+# Libraries the app only needs for some views or features; none should load on first render
+DEFERRED = ('plotly', 'folium', 'streamlit_folium', 'streamlit_lottie', 'groq', 'anthropic')
+def parse_importtime(stderr):
+    """{top-level package: self microseconds} for imports after MARKER"""
+    per_package = {}
+    started = False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "imported package" in line:
+            continue
+        # "import time:   self_us |   cumulative_us |   [indent]package.module"
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        per_package[package] = per_package.get(package, 0) + int(self_us)
+    return per_package
+def run_once():
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=300)
+    result_line = next((line for line in reversed(proc.stdout.splitlines()) if line.startswith("{")), None)
+    if proc.returncode != 0 or result_line is None:
+        raise RuntimeError(f"probe failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(result_line), parse_importtime(proc.stderr)
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--history", help="append a summary row to this CSV to track startup over time")
+    args = parser.parse_args()
+
+    renders, import_totals, packages = [], [], {}
+    for _ in range(args.runs):
+        result, per_package = run_once()
+        renders.append(result['first_render_ms'])
+        import_totals.append(sum(per_package.values()) / 1000)
+        for name, us in per_package.items():
+            packages.setdefault(name, []).append(us / 1000)
+
+    print(f"first render  median {statistics.median(renders):7.0f} ms  min {min(renders):7.0f} ms  ({args.runs} cold runs)")
+    print(f"app imports   median {statistics.median(import_totals):7.0f} ms  (self time, after the harness)")
+    print(f"\n{'package':<24}{'median ms':>10}")
+    ranked = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))
+    for name, samples in ranked[:args.top]:
+        print(f"{name:<24}{statistics.median(samples):>10.1f}")
+    eager = [name for name in DEFERRED if name in packages]
+    print("\ndeferred libraries imported on first render: " + (", ".join(eager) if eager else "none"))
+
+    if args.history:
+        new_file = not os.path.exists(args.history)
+        with open(args.history, "a", newline="") as handle:
+            writer = csv.writer(handle)
+            if new_file:
+                writer.writerow(["timestamp", "revision", "runs", "first_render_ms", "app_imports_ms", "eager_deferred"])
+            writer.writerow([time.strftime("%Y-%m-%dT%H:%M:%S"), git_revision(), args.runs,
+                             round(statistics.median(renders), 1), round(statistics.median(import_totals), 1), " ".join(eager)])
+if __name__ == "__main__":
+    main()
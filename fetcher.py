@@ -0,0 +1,94 @@
+# fetcher.py
+"""Concurrent OpenWeather fetch layer - issues the endpoint calls in parallel"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import time
+from http_client import http_get
+from metrics import REGISTRY, UPSTREAM_REQUESTS
+from weather_cache import snap
+from singleflight import SingleFlight
+
+OPENWEATHER_BASE_URL = "https://api.openweathermap.org"
+ENDPOINTS = {
+    'current': "/data/2.5/weather",
+    'forecast': "/data/2.5/forecast",
+    'air_quality': "/data/2.5/air_pollution",
+}
+# Endpoints that accept a units parameter (air pollution does not)
+UNIT_ENDPOINTS = ('current', 'forecast')
+MAX_WORKERS = 8
+# Result of one endpoint call: payload is None whenever status_code != 200 or error is set
+FetchResult = namedtuple('FetchResult', ['status_code', 'payload', 'error'])
+# Bounded pool shared by every script run in the process
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="owm-fetch")
+# Multi-location batches fan out on their own small pool so they can't starve single-location loads
+BATCH_WORKERS = 4
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="owm-batch")
+# Identical in-flight fetches (endpoint, grid-snapped lat/lon, units) share one upstream call
+inflight = SingleFlight()
+REGISTRY.register_collector(lambda: [
+    ('weather_fetch_coalesced_total', 'counter', 'OpenWeather fetches by role: leader went upstream, shared joined one in flight',
+     [({'role': 'leader'}, inflight.leaders), ({'role': 'shared'}, inflight.shared)]),
+])
+def build_params(endpoint, lat, lon, key, units='metric'):
+    params = {'lat': lat, 'lon': lon, 'appid': key}
+    if endpoint in UNIT_ENDPOINTS:
+        params['units'] = units
+    return params
+def fetch_endpoint(endpoint, lat, lon, key, units='metric', base_url=OPENWEATHER_BASE_URL, timeout=10):
+    """Fetch a single OpenWeather endpoint, never raising"""
+    try:
+        resp = http_get(base_url + ENDPOINTS[endpoint], params=build_params(endpoint, lat, lon, key, units), timeout=timeout)
+        if resp.status_code != 200:
+            return FetchResult(resp.status_code, None, None)
+        return FetchResult(200, resp.json(), None)
+    except Exception as e:
+        return FetchResult(None, None, e)
+def is_cacheable(result):
+    if result.status_code != 200 or not isinstance(result.payload, dict):
+        return False
+    return str(result.payload.get('cod', 200)) == "200"
+def fetch_and_store(endpoint, lat, lon, key, units, base_url, timeout, cache):
+    result = fetch_endpoint(endpoint, lat, lon, key, units, base_url, timeout)
+    if cache is not None and is_cacheable(result):
+        cache.set(cache.make_key(endpoint, lat, lon, units), result.payload)
+    return result
+def fetch_weather_bundle(lat, lon, key, units='metric', endpoints=tuple(ENDPOINTS), base_url=OPENWEATHER_BASE_URL, timeout=10, cache=None, limiter=None, refresh=False):
+    """Fetch several endpoints at once; total latency is the slowest call, not the sum.
+    With a cache, fresh endpoints are served from it and only the misses go upstream
+    (refresh=True skips the lookup but still stores the results, for background prefetching).
+    Misses already being fetched by another session join that call instead of starting their own.
+    With a limiter, each call started here first waits for a token in the caller's thread - never in the
+    shared pool - and a miss that can't get one within timeout seconds is reported as a local 429."""
+    results = {}
+    if cache is not None:
+        lat, lon = snap(lat, cache.grid), snap(lon, cache.grid)
+        for endpoint in () if refresh else endpoints:
+            payload = cache.get(cache.make_key(endpoint, lat, lon, units))
+            if payload is not None:
+                results[endpoint] = FetchResult(200, payload, None)
+    deadline = time.monotonic() + timeout
+    futures = {}
+    for endpoint in endpoints:
+        if endpoint in results:
+            continue
+        flight = (base_url, endpoint, lat, lon, units)
+        future = inflight.get(flight) # joining a call in flight costs no quota
+        if future is None:
+            if limiter is not None and not limiter.acquire(timeout=max(0, deadline - time.monotonic())):
+                UPSTREAM_REQUESTS.inc(service='openweather', endpoint=ENDPOINTS[endpoint].rsplit('/', 1)[-1], status='rate_limited')
+                results[endpoint] = FetchResult(429, None, None)
+                continue
+            future = inflight.submit(flight, _executor, fetch_and_store, endpoint, lat, lon, key, units, base_url, timeout, cache)
+        futures[endpoint] = future
+    for endpoint, future in futures.items():
+        results[endpoint] = future.result()
+    return {endpoint: results[endpoint] for endpoint in endpoints}
+def fetch_current_batch(locations, key, units='metric', base_url=OPENWEATHER_BASE_URL, timeout=10, cache=None, limiter=None):
+    """Current conditions for many (lat, lon) pairs at once, in input order.
+    At most BATCH_WORKERS locations are in flight; cache, coalescing and the limiter still apply per call."""
+    futures = [
+        _batch_executor.submit(fetch_weather_bundle, lat, lon, key, units, ('current',), base_url, timeout, cache, limiter)
+        for lat, lon in locations
+    ]
+    return [future.result()['current'] for future in futures]
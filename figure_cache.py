@@ -0,0 +1,99 @@
+# figure_cache.py
+"""Process-wide cache of built Plotly figures / Folium maps keyed by a content hash, with per-chart timings.
+Callers always get their own copy: the cached objects are shared by every session and thread, and both
+libraries mutate them (Folium attaches a map to the page it renders into)."""
+from collections import OrderedDict
+from contextlib import contextmanager
+import copy
+import hashlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+def content_hash(*parts):
+    """Stable digest of the chart inputs (arrays, frames, series, scalars)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, (pd.Series, pd.Index, np.ndarray, list, tuple)):
+            values = np.asarray(part)
+            if values.dtype == object or values.dtype.kind in 'UM':
+                values = values.astype(str)
+            digest.update(str(values.dtype).encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+def detached(figure):
+    """Copy of a cached figure that the caller may render or change; Plotly copies without deepcopy's overhead"""
+    if hasattr(figure, 'to_plotly_json'):
+        return type(figure)(figure)
+    return copy.deepcopy(figure)
+class FigureCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._figures = OrderedDict() # (name, hash) -> figure
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _metric(self, name):
+        return self._metrics.setdefault(name, {'hits': 0, 'builds': 0, 'build_ms': 0.0, 'renders': 0, 'render_ms': 0.0})
+
+    def get_or_build(self, name, parts, build):
+        key = (name, content_hash(*parts))
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self._metric(name)['hits'] += 1
+        if figure is not None:
+            return detached(figure)
+        start = time.perf_counter()
+        figure = build()
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            metric = self._metric(name)
+            metric['builds'] += 1
+            metric['build_ms'] += elapsed
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return detached(figure)
+
+    @contextmanager
+    def timed_render(self, name):
+        """Time the st.* call that ships a figure to the browser"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                metric = self._metric(name)
+                metric['renders'] += 1
+                metric['render_ms'] += elapsed
+
+    def metrics(self):
+        """Per-chart cache hits and average build / render time in ms"""
+        with self._lock:
+            return {
+                name: {
+                    'hits': m['hits'],
+                    'builds': m['builds'],
+                    'avg_build_ms': m['build_ms'] / m['builds'] if m['builds'] else 0.0,
+                    'avg_render_ms': m['render_ms'] / m['renders'] if m['renders'] else 0.0,
+                }
+                for name, m in self._metrics.items()
+            }
+_cache = None
+_cache_lock = threading.Lock()
+def get_figure_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FigureCache()
+    return _cache
@@ -0,0 +1,64 @@
+# forecast_frame.py
+"""Columnar forecast representation - the 3-hourly list parsed once, aggregated with vectorized group-bys"""
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ('temp', 'feels_like', 'humidity', 'pressure', 'wind_speed', 'clouds', 'pop')
+TEXT_COLUMNS = ('main', 'description', 'icon')
+def build_forecast_frame(forecast):
+    """One row per 3-hour step. 'time' is the location's local wall-clock time (from city.timezone)."""
+    items = forecast.get('list') or []
+    if not items:
+        frame = pd.DataFrame({name: pd.Series(dtype='float32') for name in NUMERIC_COLUMNS})
+        frame['time'] = pd.Series(dtype='datetime64[ns]')
+        frame['date'] = pd.Series(dtype='datetime64[ns]')
+        for name in TEXT_COLUMNS:
+            frame[name] = pd.Series(dtype='category')
+        return frame
+    shift = (forecast.get('city') or {}).get('timezone', 0)
+    epoch = np.fromiter((item['dt'] for item in items), dtype='int64', count=len(items))
+    time = pd.to_datetime(epoch + shift, unit='s')
+    frame = pd.DataFrame({
+        'time': time,
+        'date': time.normalize(),
+        'temp': [item['main']['temp'] for item in items],
+        'feels_like': [item['main'].get('feels_like', item['main']['temp']) for item in items],
+        'humidity': [item['main'].get('humidity', 0) for item in items],
+        'pressure': [item['main'].get('pressure', 0) for item in items],
+        'wind_speed': [item.get('wind', {}).get('speed', 0) for item in items],
+        'clouds': [item.get('clouds', {}).get('all', 0) for item in items],
+        'pop': [item.get('pop', 0) for item in items],
+        'main': [item['weather'][0]['main'] for item in items],
+        'description': [item['weather'][0]['description'] for item in items],
+        'icon': [item['weather'][0]['icon'] for item in items],
+    })
+    frame[list(NUMERIC_COLUMNS)] = frame[list(NUMERIC_COLUMNS)].astype('float32')
+    frame[list(TEXT_COLUMNS)] = frame[list(TEXT_COLUMNS)].astype('category')
+    return frame.sort_values('time', kind='stable', ignore_index=True)
+def group_mode(frame, column, by='date'):
+    """Most frequent value of a categorical column per group, via a (group x category) count matrix.
+    Ties go to the first category in sort order."""
+    keys, group_idx = np.unique(frame[by].to_numpy(), return_inverse=True)
+    values = frame[column].astype('category')
+    counts = np.zeros((len(keys), len(values.cat.categories)), dtype=np.int32)
+    np.add.at(counts, (group_idx, values.cat.codes.to_numpy()), 1)
+    return pd.Series(values.cat.categories.to_numpy()[counts.argmax(axis=1)].astype(str), index=pd.Index(keys, name=by))
+def daily_summary(frame):
+    """Per-day max/min/mean temperature, modal condition and icon, mean precipitation chance, max wind.
+    Rows are time-ordered, so each day is a contiguous run and numpy reduceat aggregates it in one pass."""
+    columns = ['max_temp', 'min_temp', 'mean_temp', 'avg_pop', 'max_wind', 'main_condition', 'icon']
+    if frame.empty:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='date'))
+    dates = frame['date'].to_numpy()
+    keys, starts, sizes = np.unique(dates, return_index=True, return_counts=True)
+    temp = frame['temp'].to_numpy()
+    daily = pd.DataFrame({
+        'max_temp': np.maximum.reduceat(temp, starts),
+        'min_temp': np.minimum.reduceat(temp, starts),
+        'mean_temp': np.add.reduceat(temp, starts) / sizes,
+        'avg_pop': np.add.reduceat(frame['pop'].to_numpy(), starts) / sizes,
+        'max_wind': np.maximum.reduceat(frame['wind_speed'].to_numpy(), starts),
+    }, index=pd.DatetimeIndex(keys, name='date'))
+    daily['main_condition'] = group_mode(frame, 'description').to_numpy()
+    daily['icon'] = group_mode(frame, 'icon').to_numpy()
+    return daily[columns]
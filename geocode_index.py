@@ -0,0 +1,123 @@
+# geocode_index.py
+"""In-memory geocoding index - exact, prefix and fuzzy lookup over resolved queries and a bundled city list"""
+import bisect
+import csv
+import difflib
+import os
+import re
+import threading
+from storage import get_store
+
+CITIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.csv")
+FUZZY_CUTOFF = 0.85
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# "40.7,-74.0" / "40.7 -74.0" - normalizing drops sign and decimal point, so these never enter the index
+_COORDINATES = re.compile(r"^\s*[-+]?\d+(?:\.\d+)?\s*[,\s]\s*[-+]?\d+(?:\.\d+)?\s*$")
+QUALIFIER_LENGTH = 3 # tokens this short are country / state codes ('ga', 'uk', 'usa')
+def normalize_name(text):
+    """'  Paris,  FR ' -> 'paris fr'"""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+def is_coordinates(text):
+    return bool(_COORDINATES.match(text))
+def qualifier_tokens(query):
+    """Tokens a fuzzy match must contain verbatim: everything after the first comma plus any short code"""
+    place, _, qualifier = query.partition(',')
+    tokens = set(normalize_name(qualifier).split())
+    tokens.update(token for token in normalize_name(place).split()[1:] if len(token) <= QUALIFIER_LENGTH)
+    return tokens
+class GeocodeIndex:
+    """Sorted normalized names -> (lat, lon, full_loc). Prefix queries are a bisect range;
+    fuzzy matching only compares names sharing the query's first letter to stay sub-millisecond."""
+    def __init__(self):
+        self._names = [] # sorted
+        self._entries = {}
+        self._by_initial = {} # first character -> names
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, lat, lon, full_loc, replace=True):
+        if is_coordinates(name):
+            return
+        key = normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            if key in self._entries:
+                if replace:
+                    self._entries[key] = (lat, lon, full_loc)
+                return
+            self._entries[key] = (lat, lon, full_loc)
+            bisect.insort(self._names, key)
+            self._by_initial.setdefault(key[0], []).append(key)
+
+    def exact(self, query):
+        if is_coordinates(query):
+            return None
+        return self._entries.get(normalize_name(query))
+
+    def prefix(self, query, limit=8):
+        """[(name, (lat, lon, full_loc))] for names starting with query, alphabetically"""
+        key = normalize_name(query)
+        if not key or is_coordinates(query):
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._names, key)
+            matches = []
+            for name in self._names[start:start + limit]:
+                if not name.startswith(key):
+                    break
+                matches.append((name, self._entries[name]))
+            return matches
+
+    def fuzzy(self, query, cutoff=FUZZY_CUTOFF, limit=1):
+        """[(name, (lat, lon, full_loc))] closest to a misspelt or near-duplicate query, best first"""
+        key = normalize_name(query)
+        if not key or is_coordinates(query):
+            return []
+        with self._lock:
+            candidates = list(self._by_initial.get(key[0], ()))
+        close = difflib.get_close_matches(key, candidates, n=limit, cutoff=cutoff)
+        return [(name, self._entries[name]) for name in close]
+
+    def lookup(self, query):
+        """Exact match, else a fuzzy match that keeps every country / state qualifier of the query ('Athens, GA'
+        never resolves to Athens, GR); None means go to the network. A bare prefix is only ever a suggestion -
+        'Sant' is the start of a typed name, not Santiago."""
+        found = self.exact(query)
+        if found:
+            return found
+        required = qualifier_tokens(query)
+        for name, entry in self.fuzzy(query, limit=3):
+            if required <= set(name.split()) | set(normalize_name(entry[2]).split()):
+                return entry
+        return None
+
+    def load_cities(self, path=CITIES_PATH):
+        """Seed from a name,country,lat,lon CSV. Indexed as 'name' and 'name cc';
+        the first row wins a bare name shared by several cities, so the file lists the larger one first."""
+        with open(path, newline='', encoding='utf-8') as handle:
+            for row in csv.DictReader(handle):
+                lat, lon = float(row['lat']), float(row['lon'])
+                full_loc = f"{row['name']}, {row['country']}"
+                self.add(row['name'], lat, lon, full_loc, replace=False)
+                self.add(full_loc, lat, lon, full_loc, replace=False)
+_index = None
+_index_lock = threading.Lock()
+def get_geocode_index():
+    """Process-wide index seeded with the bundled cities and every query already resolved in the store"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = GeocodeIndex()
+                if os.path.exists(CITIES_PATH):
+                    index.load_cities()
+                try:
+                    for query, lat, lon, full_loc in get_store().list_geocodes():
+                        index.add(query, lat, lon, full_loc)
+                except Exception:
+                    pass
+                _index = index
+    return _index
@@ -0,0 +1,172 @@
+# history_store.py
+"""Append-only local time series of observations and forecast snapshots, partitioned by location and UTC day.
+
+Layout: <root>/<lat>_<lon>/<YYYY-MM-DD>/observations.bin and forecasts.bin. Each file is a flat array of
+fixed-size little-endian records (OBSERVATION / FORECAST below), so appending is a single write and a range
+query reads only the day files it overlaps with np.fromfile."""
+from datetime import datetime, timezone
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from weather_cache import snap
+
+DEFAULT_ROOT = os.getenv("WEATHER_HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history"))
+GRID = 0.01
+FORECAST_INTERVAL = 3 * 3600 # keep at most one forecast snapshot per location per this many seconds
+# OpenWeather 'main' condition groups; stored as a one-byte code, unknown -> 255
+CONDITIONS = ('Clear', 'Clouds', 'Rain', 'Drizzle', 'Thunderstorm', 'Snow', 'Mist', 'Smoke', 'Haze',
+              'Dust', 'Fog', 'Sand', 'Ash', 'Squall', 'Tornado')
+UNKNOWN_CONDITION = 255
+OBSERVATION = np.dtype([('ts', '<i8'), ('temp', '<f4'), ('feels_like', '<f4'), ('humidity', '<f4'),
+                        ('pressure', '<f4'), ('wind_speed', '<f4'), ('clouds', '<f4'), ('condition', 'u1')])
+FORECAST = np.dtype([('issued', '<i8'), ('valid', '<i8'), ('temp', '<f4'), ('humidity', '<f4'),
+                     ('wind_speed', '<f4'), ('pop', '<f4')])
+FILES = {'observations': ('observations.bin', OBSERVATION, 'ts'), 'forecasts': ('forecasts.bin', FORECAST, 'issued')}
+def condition_code(name):
+    try:
+        return CONDITIONS.index(name)
+    except ValueError:
+        return UNKNOWN_CONDITION
+def utc_day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d')
+def downsample(frame, step, time_column='time'):
+    """Mean of every numeric column per step-second bucket (rows must be time-ordered); bucket start as time"""
+    if frame.empty:
+        return frame
+    epoch = frame[time_column].to_numpy().astype('datetime64[s]').astype('int64')
+    buckets = epoch // step * step
+    keys, starts = np.unique(buckets, return_index=True)
+    sizes = np.diff(np.append(starts, len(buckets)))
+    numeric = frame.select_dtypes('number')
+    out = pd.DataFrame({
+        name: np.add.reduceat(numeric[name].to_numpy(dtype='float64'), starts) / sizes for name in numeric.columns
+    })
+    out.insert(0, time_column, pd.to_datetime(keys, unit='s'))
+    return out
+def forecast_with_valid(snapshot):
+    """snapshot.forecast plus a 'valid' column: its location-local times converted back to UTC epoch seconds"""
+    forecast = snapshot.forecast
+    if forecast.empty:
+        return forecast
+    local = forecast['time'].to_numpy().astype('datetime64[s]').astype('int64')
+    return forecast.assign(valid=local - snapshot.current.timezone)
+class HistoryStore:
+    def __init__(self, root=DEFAULT_ROOT, grid=GRID, forecast_interval=FORECAST_INTERVAL):
+        self.root = root
+        self.grid = grid
+        self.forecast_interval = forecast_interval
+        self._lock = threading.Lock()
+        self._last = {} # (location dir, kind) -> newest ts written
+
+    def location_dir(self, lat, lon):
+        return os.path.join(self.root, f"{snap(lat, self.grid):.2f}_{snap(lon, self.grid):.2f}")
+
+    def _last_written(self, location, kind):
+        """Newest ts in the location's latest day file (read once, then tracked in memory)"""
+        key = (location, kind)
+        if key not in self._last:
+            filename, dtype, ts_field = FILES[kind]
+            newest = 0
+            days = self._days(location)
+            for day in reversed(days):
+                path = os.path.join(location, day, filename)
+                if os.path.exists(path) and os.path.getsize(path) >= dtype.itemsize:
+                    newest = int(np.fromfile(path, dtype=dtype)[ts_field].max())
+                    break
+            self._last[key] = newest
+        return self._last[key]
+
+    def _append(self, location, kind, records):
+        filename, _, ts_field = FILES[kind]
+        record_days = np.array([utc_day(ts) for ts in records[ts_field]])
+        for day in np.unique(record_days):
+            part = records[record_days == day]
+            os.makedirs(os.path.join(location, day), exist_ok=True)
+            with open(os.path.join(location, day, filename), 'ab') as handle:
+                handle.write(part.tobytes())
+        self._last[(location, kind)] = int(records[ts_field].max())
+
+    def record_observation(self, lat, lon, current):
+        """Append a CurrentConditions unless that observation time is already stored; returns True if written"""
+        location = self.location_dir(lat, lon)
+        with self._lock:
+            if current.observed_at <= self._last_written(location, 'observations'):
+                return False
+            record = np.array([(current.observed_at, current.temp, current.feels_like, current.humidity, current.pressure,
+                                current.wind_speed, current.clouds, condition_code(current.condition))], dtype=OBSERVATION)
+            self._append(location, 'observations', record)
+            return True
+
+    def record_forecast(self, lat, lon, frame, issued=None):
+        """Append forecast steps (a frame with a UTC epoch 'valid' column) as issued now, at most once per forecast_interval"""
+        if frame.empty:
+            return False
+        issued = int(issued or time.time())
+        location = self.location_dir(lat, lon)
+        with self._lock:
+            if issued - self._last_written(location, 'forecasts') < self.forecast_interval:
+                return False
+            records = np.zeros(len(frame), dtype=FORECAST)
+            records['issued'] = issued
+            records['valid'] = frame['valid'].to_numpy() # UTC epoch seconds, see record_snapshot
+            for name in ('temp', 'humidity', 'wind_speed', 'pop'):
+                records[name] = frame[name].to_numpy()
+            self._append(location, 'forecasts', records)
+            return True
+
+    def _days(self, location, start=None, end=None):
+        if not os.path.isdir(location):
+            return []
+        days = sorted(name for name in os.listdir(location) if len(name) == 10)
+        if start is not None:
+            days = [day for day in days if utc_day(start) <= day <= utc_day(end)]
+        return days
+
+    def days(self, lat, lon):
+        return self._days(self.location_dir(lat, lon))
+
+    def _read(self, lat, lon, kind, start, end):
+        filename, dtype, ts_field = FILES[kind]
+        location = self.location_dir(lat, lon)
+        chunks = [np.fromfile(os.path.join(location, day, filename), dtype=dtype)
+                  for day in self._days(location, start, end) if os.path.exists(os.path.join(location, day, filename))]
+        records = np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+        records = records[(records[ts_field] >= start) & (records[ts_field] <= end)]
+        return records[np.argsort(records[ts_field], kind='stable')]
+
+    def observations(self, lat, lon, start, end, step=None):
+        """Observations with UTC epoch seconds start <= ts <= end as a frame (time is UTC); step= downsamples"""
+        records = self._read(lat, lon, 'observations', start, end)
+        frame = pd.DataFrame({name: records[name] for name in OBSERVATION.names if name not in ('ts', 'condition')})
+        frame.insert(0, 'time', pd.to_datetime(records['ts'], unit='s'))
+        if step:
+            return downsample(frame, step)
+        codes = records['condition']
+        frame['condition'] = pd.Categorical.from_codes(np.where(codes < len(CONDITIONS), codes, -1), categories=CONDITIONS)
+        return frame
+
+    def forecasts(self, lat, lon, start, end):
+        """Forecast steps from snapshots issued between start and end (UTC epoch seconds)"""
+        records = self._read(lat, lon, 'forecasts', start, end)
+        frame = pd.DataFrame({name: records[name] for name in FORECAST.names})
+        frame['issued'] = pd.to_datetime(frame['issued'], unit='s')
+        frame['valid'] = pd.to_datetime(frame['valid'], unit='s')
+        return frame
+
+    def record_snapshot(self, lat, lon, snapshot, issued=None):
+        """Both halves of a WeatherSnapshot; returns (observation written, forecast written)"""
+        observed = self.record_observation(lat, lon, snapshot.current)
+        return observed, self.record_forecast(lat, lon, forecast_with_valid(snapshot), issued)
+_store = None
+_store_lock = threading.Lock()
+def get_history_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
@@ -0,0 +1,108 @@
+# http_client.py
+"""Shared HTTP client - pooled keep-alive sessions per host with retries and concurrency caps"""
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import UPSTREAM_BYTES, UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_SECONDS
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Hosts whose quota is metered by a local token bucket: a 429 goes straight back to the caller, since a
+# transport-level retry would spend quota the bucket never granted
+RATE_LIMITED_HOSTS = frozenset(['api.openweathermap.org'])
+MAX_BACKOFF = 2.0 # seconds; retries sleep while holding the host's in-flight slot
+DEFAULT_TIMEOUT = 10
+# Metric labels per host; anything else is labelled by its host name
+SERVICE_NAMES = {'api.openweathermap.org': 'openweather', 'ip-api.com': 'ip-api',
+                 'nominatim.openstreetmap.org': 'nominatim'}
+def call_labels(parts):
+    """(service, endpoint) for a split URL. OpenWeather is labelled by its last path segment (weather, forecast,
+    air_pollution, direct); other hosts by their first, so per-request path values never become labels."""
+    segments = [segment for segment in parts.path.split('/') if segment]
+    service = SERVICE_NAMES.get(parts.hostname, parts.hostname)
+    if not segments:
+        return service, '/'
+    return service, segments[-1] if service == 'openweather' else segments[0]
+class HttpClient:
+    """One keep-alive Session per host; each host gets its own retry policy and in-flight cap.
+    Retry-After is not honoured - a server asking for minutes would park the slot - and backoff is capped."""
+    def __init__(self, max_per_host=8, retries=3, backoff_factor=0.5, timeout=DEFAULT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self, host):
+        statuses = [status for status in RETRY_STATUSES if status != 429 or host not in RATE_LIMITED_HOSTS]
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_max=MAX_BACKOFF,
+            status_forcelist=statuses,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=False,
+            raise_on_status=False # hand the last 429/5xx back to the caller's status handling
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.max_per_host)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({'User-Agent': 'weather_app'})
+        return session
+
+    def _host_entry(self, host):
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None:
+                entry = (self._build_session(host), threading.BoundedSemaphore(self.max_per_host))
+                self._hosts[host] = entry
+            return entry
+
+    def get(self, url, **kwargs):
+        parts = urlsplit(url)
+        session, limit = self._host_entry(parts.netloc)
+        kwargs.setdefault('timeout', self.timeout)
+        service, endpoint = call_labels(parts)
+        start = time.perf_counter()
+        status = None
+        try:
+            with limit:
+                response = session.get(url, **kwargs)
+            status = response.status_code
+            UPSTREAM_BYTES.inc(len(response.content), service=service, endpoint=endpoint)
+            retries = getattr(response.raw, 'retries', None)
+            if retries is not None and retries.history:
+                UPSTREAM_RETRIES.inc(len(retries.history), service=service, endpoint=endpoint)
+            return response
+        except Exception as e:
+            status = type(e).__name__
+            raise
+        finally:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, service=service, endpoint=endpoint)
+            UPSTREAM_REQUESTS.inc(service=service, endpoint=endpoint, status=status)
+
+    def hosts(self):
+        with self._lock:
+            return sorted(self._hosts)
+
+    def close(self):
+        with self._lock:
+            hosts, self._hosts = self._hosts, {}
+        for session, _ in hosts.values():
+            session.close()
+_client = None
+_client_lock = threading.Lock()
+def get_http_client():
+    """Process-wide client shared by every script run"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+def http_get(url, **kwargs):
+    return get_http_client().get(url, **kwargs)
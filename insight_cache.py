@@ -0,0 +1,110 @@
+# insight_cache.py
+"""Stale-while-revalidate cache for LLM weather insights"""
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+from metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30 * 60
+TEMP_BUCKET = 2.0 # degrees per bucket, in the display unit
+def temp_bucket(temp, size=TEMP_BUCKET):
+    """Lower edge of the bucket holding temp, so 20.3 and 21.9 share an insight"""
+    return int(temp // size * size)
+class NotCached(str):
+    """Text to show this once but never store - e.g. the canned fallback returned while every provider is down"""
+def make_insight_key(location, condition, temp, unit):
+    return (" ".join(str(location).lower().split()), condition.lower(), temp_bucket(temp), unit)
+class InsightCache:
+    """Fresh entries are served directly; stale ones are served while a background refresh runs.
+    Only a cold key blocks the caller. A refresh thread has no page to write to, so its errors are logged
+    and queued; the next foreground read shows them via take_errors()."""
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=512, max_workers=2, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict() # key -> (stored_at, text)
+        self._refreshing = set()
+        self._errors = deque(maxlen=20) # background refresh errors not yet shown
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="insight-refresh")
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if self._clock() - entry[0] < self.ttl:
+                    self.hits += 1
+                    return entry[1]
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._executor.submit(self._refresh, key, compute)
+                return entry[1]
+            self.misses += 1
+        text = compute()
+        self._store(key, text)
+        return text
+
+    def _refresh(self, key, compute):
+        try:
+            self._store(key, compute())
+        except Exception as e:
+            self.defer_error(f"AI insight refresh failed: {e}") # keep serving the stale text; the next stale hit retries
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def defer_error(self, message):
+        """Record an error raised off the script thread, e.g. by compute() during a background refresh"""
+        log.warning(message)
+        self._errors.append(message)
+
+    def take_errors(self):
+        """Deferred error messages, oldest first; each is returned once"""
+        errors = []
+        while self._errors:
+            try:
+                errors.append(self._errors.popleft())
+            except IndexError:
+                break
+        return errors
+
+    def _store(self, key, text):
+        """NotCached text is dropped, so a cold key retries next time and a stale entry keeps its text"""
+        if isinstance(text, NotCached):
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'stale_hits': self.stale_hits,
+                    'misses': self.misses, 'refreshing': len(self._refreshing)}
+def insight_metrics(cache):
+    stats = cache.stats()
+    lookups = [({'result': name}, stats[name]) for name in ('hits', 'stale_hits', 'misses')]
+    return [
+        ('weather_insight_cache_lookups_total', 'counter', 'AI insight cache lookups by result', lookups),
+        ('weather_insight_cache_entries', 'gauge', 'Cached AI insights', [({}, stats['entries'])]),
+    ]
+_cache = None
+_cache_lock = threading.Lock()
+def get_insight_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = InsightCache()
+                REGISTRY.register_collector(lambda: insight_metrics(_cache))
+    return _cache
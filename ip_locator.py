@@ -0,0 +1,180 @@
+# ip_locator.py
+"""Client IP -> approximate location. Default backend is a local memory-mapped table of sorted IPv4 ranges;
+the ip-api.com lookup is only an optional fallback run off the script thread. Results are cached per client IP."""
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import ipaddress
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+from http_client import http_get
+
+DEFAULT_DB_PATH = os.getenv("IP_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ip_ranges.bin"))
+REMOTE_URL = "http://ip-api.com/json/"
+MAGIC = b"IPRANGE1"
+HEADER = np.dtype([('magic', 'S8'), ('count', '<u4'), ('labels_offset', '<u4')])
+# Columnar body: count values per column, each a contiguous little-endian array, so searchsorted runs on the map itself
+COLUMNS = (('start', '<u4'), ('end', '<u4'), ('lat', '<f4'), ('lon', '<f4'), ('label', '<u4'))
+IPLocation = namedtuple('IPLocation', ['lat', 'lon', 'label', 'source'])
+def ip_to_int(ip):
+    """IPv4 text -> int, None for IPv6 or garbage"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return int(address) if address.version == 4 else None
+def write_database(ranges, path):
+    """ranges: iterable of (start_ip, end_ip, lat, lon, label). Written sorted, labels de-duplicated."""
+    labels = {}
+    rows = []
+    for start, end, lat, lon, label in ranges:
+        start, end = ip_to_int(start), ip_to_int(end)
+        if start is None or end is None:
+            continue
+        rows.append((start, end, lat, lon, labels.setdefault(label, len(labels))))
+    rows.sort()
+    columns = [np.array([row[i] for row in rows], dtype=dtype) for i, (_, dtype) in enumerate(COLUMNS)]
+    header = np.array([(MAGIC, len(rows), HEADER.itemsize + sum(column.nbytes for column in columns))], dtype=HEADER)
+    with open(path, 'wb') as handle:
+        handle.write(header.tobytes())
+        for column in columns:
+            handle.write(column.tobytes())
+        handle.write("\n".join(labels).encode('utf-8'))
+    return len(rows)
+class MmapIPDatabase:
+    """Sorted, non-overlapping ranges viewed in place through mmap; lookup is one searchsorted over the start column"""
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = np.frombuffer(self._map, dtype=HEADER, count=1)[0]
+        if header['magic'] != MAGIC:
+            raise ValueError(f"{path} is not an IP range database")
+        count, offset = int(header['count']), HEADER.itemsize
+        self._columns = {}
+        for name, dtype in COLUMNS:
+            self._columns[name] = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+            offset += self._columns[name].nbytes
+        self._count = count
+        self._labels = self._map[int(header['labels_offset']):].decode('utf-8').split("\n")
+
+    def __len__(self):
+        return self._count
+
+    def lookup(self, ip):
+        value = ip_to_int(ip)
+        if value is None or not self._count:
+            return None
+        columns = self._columns
+        # np.uint32 keeps the search in the column's dtype; a Python int would upcast (copy) the whole column
+        index = int(columns['start'].searchsorted(np.uint32(value), side='right')) - 1
+        if index < 0 or value > columns['end'][index]:
+            return None
+        return IPLocation(float(columns['lat'][index]), float(columns['lon'][index]), self._labels[columns['label'][index]], 'local')
+
+    def close(self):
+        self._columns = {}
+        self._count = 0
+        try:
+            self._map.close()
+        except BufferError:
+            pass # a caller still holds a record view; the map is released with it
+        self._file.close()
+class RemoteIPLocator:
+    """ip-api.com; with ip=None it reports the caller's own public address (local development)"""
+    def __init__(self, url=REMOTE_URL, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def lookup(self, ip):
+        response = http_get(self.url + (ip or ''), timeout=self.timeout)
+        data = response.json()
+        if data.get('status') != 'success':
+            return None
+        return IPLocation(data['lat'], data['lon'], f"{data['city']}, {data['country']}", 'remote')
+class IPLocator:
+    """Local backends are consulted inline; the remote fallback, if any, runs on a worker thread.
+    Found locations are cached per IP for ttl seconds, misses for miss_ttl."""
+    def __init__(self, backends=(), fallback=None, ttl=24 * 3600, miss_ttl=300, clock=time.monotonic):
+        self.backends = list(backends)
+        self.fallback = fallback
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._cache = {} # ip -> (expires_at, IPLocation or None)
+        self._pending = {} # ip -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ip-locate") if fallback else None
+
+    def _cached(self, ip):
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry is not None and entry[0] > self._clock():
+                return True, entry[1]
+        return False, None
+
+    def _remember(self, ip, location):
+        with self._lock:
+            self._cache[ip] = (self._clock() + (self.ttl if location else self.miss_ttl), location)
+
+    def locate(self, ip):
+        """Cache or local backends only - never touches the network"""
+        hit, location = self._cached(ip)
+        if hit:
+            return location
+        for backend in self.backends:
+            location = backend.lookup(ip)
+            if location is not None:
+                self._remember(ip, location)
+                return location
+        return None
+
+    def _resolve_remote(self, ip):
+        try:
+            location = self.fallback.lookup(ip)
+        except Exception:
+            location = None
+        self._remember(ip, location)
+        with self._lock:
+            self._pending.pop(ip, None)
+        return location
+
+    def locate_async(self, ip):
+        """Future resolving to an IPLocation or None; already done unless the remote fallback is needed"""
+        hit, location = self._cached(ip)
+        if not hit:
+            location = self.locate(ip)
+        if location is not None or hit or self._executor is None:
+            future = Future()
+            future.set_result(location)
+            return future
+        with self._lock:
+            future = self._pending.get(ip)
+            if future is None:
+                future = self._pending[ip] = self._executor.submit(self._resolve_remote, ip)
+        return future
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for backend in self.backends:
+            if hasattr(backend, 'close'):
+                backend.close()
+_locator = None
+_locator_lock = threading.Lock()
+def get_ip_locator():
+    """Process-wide locator: the IP_DB_PATH range table if present, plus ip-api.com unless IP_LOOKUP_REMOTE=0"""
+    global _locator
+    if _locator is None:
+        with _locator_lock:
+            if _locator is None:
+                backends = [MmapIPDatabase(DEFAULT_DB_PATH)] if os.path.exists(DEFAULT_DB_PATH) else []
+                remote = os.getenv("IP_LOOKUP_REMOTE", "1").strip().lower() not in ('0', 'false', 'no')
+                _locator = IPLocator(backends, RemoteIPLocator() if remote else None)
+    return _locator
@@ -0,0 +1,35 @@
+# lazy_import.py
+"""Deferred imports for heavy optional libraries - nothing is loaded until the code path that needs it runs"""
+import importlib
+import importlib.util
+class LazyModule:
+    """Stand-in for `import name as alias`; the real module is imported on first attribute access"""
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # import_module holds the per-module import lock, so concurrent first uses import once
+            module = self.__dict__['_module'] = importlib.import_module(self.__dict__['_name'])
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+def lazy_module(name):
+    return LazyModule(name)
+def lazy_callable(module_name, attr):
+    """Stand-in for `from module_name import attr` where attr is only ever called (a function or class)"""
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), attr)(*args, **kwargs)
+    call.__name__ = call.__qualname__ = attr
+    call.__doc__ = f"Lazily imported {module_name}.{attr}"
+    return call
+def module_available(name):
+    """True if a top-level package is installed, without importing it"""
+    return importlib.util.find_spec(name) is not None
@@ -0,0 +1,325 @@
+# llm.py
+"""LLM provider routing - streaming completions with ordered or hedged fallback, circuit breakers and latency tracking"""
+from collections import deque
+import queue
+import threading
+import time
+from metrics import LLM_TTFT_SECONDS, UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+
+SYSTEM_PROMPT = "You are a weather expert. Provide concise, structured, and actionable insights. Use bullet points for tips and keep responses under 100 words."
+DEFAULT_HEDGE_DELAY = 2.0 # seconds, used by hedge_delay='auto' until latency samples exist
+BREAKER_FAILURES = 3
+BREAKER_RESET_SECONDS = 60
+FALLBACK_INSIGHT = "- Monitor local alerts for sudden changes.\n- Dress in layers for variable conditions.\n- Stay hydrated regardless of temperature."
+class GroqProvider:
+    name = 'groq'
+    label = 'Groq'
+    model = "llama-3.3-70b-versatile"
+
+    def __init__(self, client):
+        self.client = client
+
+    def stream(self, prompt, system_prompt=SYSTEM_PROMPT, opened=None):
+        """opened, if given, is called with a close() that aborts the HTTP stream from another thread"""
+        chunks = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": system_prompt},
+                      {"role": "user", "content": prompt}],
+            stream=True
+        )
+        if opened:
+            opened(chunks.close)
+        try:
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            chunks.close()
+class AnthropicProvider:
+    name = 'anthropic'
+    label = 'Anthropic'
+    model = "claude-3-5-sonnet-20240620"
+
+    def __init__(self, client):
+        self.client = client
+
+    def stream(self, prompt, system_prompt=SYSTEM_PROMPT, opened=None):
+        with self.client.messages.stream(
+            model=self.model,
+            max_tokens=300,
+            messages=[{"role": "user", "content": f"{system_prompt}\n\nUser query: {prompt}"}]
+        ) as stream:
+            if opened:
+                opened(stream.close)
+            for text in stream.text_stream:
+                if text:
+                    yield text
+class LatencyStats:
+    """Per-provider time-to-first-token and total latency, in milliseconds"""
+    def __init__(self, window=50):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._recent_ttft = {}
+        self.window = window
+
+    def record(self, provider, ttft_ms, total_ms):
+        with self._lock:
+            entry = self._stats.setdefault(provider, {'calls': 0, 'ttft_ms_sum': 0.0, 'total_ms_sum': 0.0})
+            entry['calls'] += 1
+            entry['ttft_ms_sum'] += ttft_ms
+            entry['total_ms_sum'] += total_ms
+            self._recent_ttft.setdefault(provider, deque(maxlen=self.window)).append(ttft_ms)
+
+    def ttft_percentile(self, provider, q=0.9, min_samples=5):
+        """q-quantile of recent time-to-first-token in ms, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._recent_ttft.get(provider, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self):
+        with self._lock:
+            return {
+                provider: {
+                    'calls': entry['calls'],
+                    'avg_ttft_ms': entry['ttft_ms_sum'] / entry['calls'],
+                    'avg_total_ms': entry['total_ms_sum'] / entry['calls'],
+                }
+                for provider, entry in self._stats.items()
+            }
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures; after reset_timeout one trial call is let through.
+    Other callers are refused while the trial is in flight, until it records a success or failure - or, if its
+    caller never reports back (cancelled or abandoned stream), until another reset_timeout has passed."""
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._trial_started = None # half-open trial in flight since
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self._clock() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        """True if the caller may use the provider now; in half-open state this claims the single trial call"""
+        with self._lock:
+            state = self.state
+            if state != 'half-open':
+                return state == 'closed'
+            now = self._clock()
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_started = None
+
+    def record_failure(self, error):
+        """Returns True when this failure opens (or re-opens) the breaker"""
+        with self._lock:
+            self.last_error = error
+            self.failures += 1
+            self._trial_started = None
+            if self.failures >= self.failure_threshold and self.state != 'open':
+                self.opened_at = self._clock()
+                return True
+            return False
+class RaceAttempt:
+    """One provider's stream in a hedged race. cancel() closes the HTTP stream right away, so a stalled
+    loser doesn't keep its connection (and thread) until its next token arrives."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._close = None
+        self.cancelled = False
+
+    def opened(self, close):
+        with self._lock:
+            self._close = close
+            cancelled = self.cancelled
+        if cancelled:
+            close()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            close = self._close
+        if close:
+            try:
+                close()
+            except Exception:
+                pass # the stream is being torn down either way
+class LLMRouter:
+    """Routes prompts across providers, skipping any whose circuit breaker is open.
+
+    Without a hedge delay providers are tried in order: one that fails before its first token hands
+    over to the next, and once tokens have been streamed the answer is committed to that provider.
+    With a hedge delay the next provider is started whenever the current ones have produced no token
+    within the delay; the first to answer wins and the others are cancelled. hedge_delay='auto' uses
+    the primary's recent p90 time-to-first-token. Every race runs its streams on threads of its own, so a
+    stalled provider never holds up another session's race."""
+    def __init__(self, providers, on_error=None, hedge_delay=None):
+        self.providers = list(providers)
+        self.on_error = on_error
+        self.hedge_delay = hedge_delay
+        self.latency = LatencyStats()
+        self.breakers = {provider.name: CircuitBreaker() for provider in self.providers}
+        self._attempts = set() # RaceAttempts still streaming, cancelled by close()
+        self._attempts_lock = threading.Lock()
+
+    def _available(self):
+        """Providers whose breaker isn't open; the breaker is asked for permission only right before each call"""
+        return [provider for provider in self.providers if self.breakers[provider.name].state != 'open']
+
+    def _failed(self, provider, error):
+        UPSTREAM_REQUESTS.inc(service=provider.name, endpoint='stream', status=type(error).__name__)
+        # Only surface the failure that trips the breaker, not every rerun's retry
+        if self.breakers[provider.name].record_failure(error) and self.on_error:
+            self.on_error(provider, error)
+
+    def _succeeded(self, provider, ttft, total, timing):
+        self.breakers[provider.name].record_success()
+        self.latency.record(provider.name, ttft * 1000, total * 1000)
+        LLM_TTFT_SECONDS.observe(ttft, provider=provider.name)
+        UPSTREAM_SECONDS.observe(total, service=provider.name, endpoint='stream')
+        UPSTREAM_REQUESTS.inc(service=provider.name, endpoint='stream', status='ok')
+        if timing is not None:
+            timing.update(provider=provider.label, ttft_ms=ttft * 1000, total_ms=total * 1000)
+
+    def _resolve_hedge_delay(self, primary):
+        if self.hedge_delay != 'auto':
+            return self.hedge_delay
+        p90 = self.latency.ttft_percentile(primary.name)
+        return p90 / 1000 if p90 is not None else DEFAULT_HEDGE_DELAY
+
+    def stream(self, prompt, timing=None):
+        """Yield answer tokens; if a timing dict is passed it is filled with provider, ttft_ms and total_ms"""
+        providers = self._available()
+        if self.hedge_delay is not None and len(providers) > 1:
+            yield from self._race(providers, prompt, timing)
+        else:
+            yield from self._sequential(providers, prompt, timing)
+
+    def _sequential(self, providers, prompt, timing):
+        for provider in providers:
+            if not self.breakers[provider.name].allow():
+                continue
+            start = time.perf_counter()
+            ttft = None
+            try:
+                for text in provider.stream(prompt):
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        text = text.lstrip()
+                    yield text
+            except Exception as e:
+                self._failed(provider, e)
+                if ttft is None:
+                    continue
+                return
+            if ttft is None: # empty completion, try the next provider
+                continue
+            self._succeeded(provider, ttft, time.perf_counter() - start, timing)
+            return
+        # Fallback structured response
+        yield FALLBACK_INSIGHT
+
+    def _race(self, providers, prompt, timing):
+        events = queue.Queue()
+        attempts = {}
+        started = {}
+        pending = list(providers)
+        active = set()
+        hedge_delay = self._resolve_hedge_delay(providers[0])
+
+        def run(provider, attempt):
+            try:
+                for text in provider.stream(prompt, opened=attempt.opened):
+                    if attempt.cancelled:
+                        return # leaving the loop closes the provider stream
+                    events.put((provider, 'token', text))
+                events.put((provider, 'done', None))
+            except Exception as e:
+                if not attempt.cancelled: # a stream closed under us by cancel() isn't a provider failure
+                    events.put((provider, 'error', e))
+            finally:
+                with self._attempts_lock:
+                    self._attempts.discard(attempt)
+
+        def launch():
+            """Start the next pending provider its breaker allows; False if none is left"""
+            while pending:
+                provider = pending.pop(0)
+                if self.breakers[provider.name].allow():
+                    break
+            else:
+                return False
+            attempt = attempts[provider.name] = RaceAttempt()
+            with self._attempts_lock:
+                self._attempts.add(attempt)
+            started[provider.name] = time.perf_counter()
+            active.add(provider.name)
+            threading.Thread(target=run, args=(provider, attempt), name=f"llm-race-{provider.name}", daemon=True).start()
+            return True
+
+        winner = None
+        ttft = None
+        launch()
+        try:
+            while active:
+                hedging = winner is None and pending
+                try:
+                    provider, kind, value = events.get(timeout=hedge_delay if hedging else None)
+                except queue.Empty:
+                    launch()
+                    continue
+                if winner is not None and provider is not winner:
+                    continue # late output from a cancelled loser
+                if kind == 'token' and winner is None:
+                    winner = provider
+                    ttft = time.perf_counter() - started[provider.name]
+                    for name, attempt in attempts.items():
+                        if name != provider.name:
+                            attempt.cancel()
+                    yield value.lstrip()
+                elif kind == 'token':
+                    yield value
+                elif kind == 'done' and winner is not None:
+                    self._succeeded(provider, ttft, time.perf_counter() - started[provider.name], timing)
+                    return
+                else:
+                    # error, or an empty completion before any token
+                    active.discard(provider.name)
+                    if kind == 'error':
+                        self._failed(provider, value)
+                    if winner is not None:
+                        return
+                    if not active and pending:
+                        launch()
+        finally:
+            for attempt in attempts.values():
+                attempt.cancel()
+        # Fallback structured response
+        yield FALLBACK_INSIGHT
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt)).strip()
+
+    def close(self):
+        with self._attempts_lock:
+            attempts = list(self._attempts)
+        for attempt in attempts:
+            attempt.cancel()
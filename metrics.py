@@ -0,0 +1,186 @@
+# metrics.py
+"""In-process counters and latency histograms with labels, rendered in Prometheus text format.
+Dependency-free on purpose: every module records into REGISTRY, server.py serves it at /metrics."""
+import bisect
+from contextlib import contextmanager
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {} # label values tuple -> float
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """[(labels dict, value)] sorted by label values"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def lines(self):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in self.samples()]
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values tuple -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """{label dict tuple: (cumulative bucket counts, count, sum)}"""
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        result = {}
+        for key, series in sorted(items):
+            cumulative, running = [], 0
+            for count in series[:-1]:
+                running += count
+                cumulative.append(running)
+            result[key] = (cumulative, running, series[-1])
+        return result
+
+    def quantile(self, q, cumulative, count):
+        """Bucket-interpolated quantile, as Prometheus histogram_quantile does"""
+        if not count:
+            return 0.0
+        rank = q * count
+        index = bisect.bisect_left(cumulative, rank)
+        if index >= len(self.buckets):
+            return self.buckets[-1]
+        lower = self.buckets[index - 1] if index else 0.0
+        below = cumulative[index - 1] if index else 0
+        in_bucket = cumulative[index] - below
+        return lower + (self.buckets[index] - lower) * ((rank - below) / in_bucket if in_bucket else 1)
+
+    def lines(self):
+        lines = []
+        for key, (cumulative, count, total) in self.snapshot().items():
+            labels = dict(zip(self.labelnames, key))
+            for bound, running in zip(self.buckets + (float('inf'),), cumulative):
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def register_collector(self, collect):
+        """collect() -> [(name, 'gauge' | 'counter', help, [(labels dict, value)])], read at scrape time"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """Prometheus text exposition format 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        out = []
+        for metric in metrics:
+            out += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"] + metric.lines()
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception:
+                continue
+            for name, kind, help_text, samples in families:
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                out += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(out) + "\n"
+
+    def latency_summary(self):
+        """Rows of {metric, labels..., count, avg_ms, p50_ms, p95_ms} for every histogram series"""
+        with self._lock:
+            histograms = [metric for metric in self._metrics.values() if isinstance(metric, Histogram)]
+        rows = []
+        for histogram in histograms:
+            for key, (cumulative, count, total) in histogram.snapshot().items():
+                rows.append({
+                    'metric': histogram.name, **dict(zip(histogram.labelnames, key)), 'count': count,
+                    'avg_ms': total / count * 1000 if count else 0.0,
+                    'p50_ms': histogram.quantile(0.5, cumulative, count) * 1000,
+                    'p95_ms': histogram.quantile(0.95, cumulative, count) * 1000,
+                })
+        return rows
+REGISTRY = Registry()
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    'weather_upstream_request_seconds', 'Latency of calls to external services', ('service', 'endpoint'))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'weather_upstream_requests_total', 'Calls to external services by outcome (HTTP status, ok or exception name)',
+    ('service', 'endpoint', 'status'))
+UPSTREAM_RETRIES = REGISTRY.counter(
+    'weather_upstream_retries_total', 'Automatic retries performed by the HTTP client', ('service', 'endpoint'))
+UPSTREAM_BYTES = REGISTRY.counter(
+    'weather_upstream_response_bytes_total', 'Response body bytes received from external services', ('service', 'endpoint'))
+OPERATION_SECONDS = REGISTRY.histogram(
+    'weather_operation_seconds', 'End-to-end latency of app operations', ('operation', 'outcome'))
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    'weather_llm_ttft_seconds', 'Time to first token per LLM provider', ('provider',))
+@contextmanager
+def timed_operation(operation):
+    """with timed_operation('geocode') as op: ... op['outcome'] = 'index' - outcome defaults to ok / error"""
+    op = {'outcome': 'ok'}
+    start = time.perf_counter()
+    try:
+        yield op
+    except Exception:
+        op['outcome'] = 'error'
+        raise
+    finally:
+        OPERATION_SECONDS.observe(time.perf_counter() - start, operation=operation, outcome=op['outcome'])
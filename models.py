@@ -0,0 +1,61 @@
+# models.py
+"""Compact in-memory weather model - slotted records instead of the raw nested OpenWeather JSON"""
+from dataclasses import dataclass
+import sys
+def _text(value):
+    # Condition names, descriptions and icon codes repeat across sessions; intern them once
+    return sys.intern(value) if value else ''
+@dataclass
+class CurrentConditions:
+    """Flattened /weather payload"""
+    __slots__ = ('name', 'observed_at', 'timezone', 'temp', 'feels_like', 'humidity', 'pressure',
+                 'wind_speed', 'clouds', 'visibility', 'condition', 'description', 'icon', 'sunrise', 'sunset')
+    name: str
+    observed_at: int
+    timezone: int
+    temp: float
+    feels_like: float
+    humidity: int
+    pressure: int
+    wind_speed: float
+    clouds: int
+    visibility: int
+    condition: str
+    description: str
+    icon: str
+    sunrise: int
+    sunset: int
+
+    @classmethod
+    def from_payload(cls, payload):
+        main = payload['main']
+        weather = payload['weather'][0]
+        sys_info = payload.get('sys') or {}
+        return cls(
+            name=_text(payload.get('name', '')),
+            observed_at=int(payload.get('dt', 0)),
+            timezone=int(payload.get('timezone', 0)),
+            temp=float(main['temp']),
+            feels_like=float(main.get('feels_like', main['temp'])),
+            humidity=int(main.get('humidity', 0)),
+            pressure=int(main.get('pressure', 0)),
+            wind_speed=float((payload.get('wind') or {}).get('speed', 0)),
+            clouds=int((payload.get('clouds') or {}).get('all', 0)),
+            visibility=int(payload.get('visibility', 10000)),
+            condition=_text(weather['main']),
+            description=_text(weather['description']),
+            icon=_text(weather['icon']),
+            sunrise=sys_info.get('sunrise'),
+            sunset=sys_info.get('sunset'),
+        )
+@dataclass
+class WeatherSnapshot:
+    """Everything the tabs render for one location. forecast is the columnar frame from
+    forecast_frame.build_forecast_frame (float32 + categorical columns), daily its daily summary."""
+    __slots__ = ('current', 'forecast', 'daily', 'aqi', 'pollen', 'alerts')
+    current: CurrentConditions
+    forecast: object
+    daily: object
+    aqi: int
+    pollen: dict
+    alerts: tuple
@@ -0,0 +1,110 @@
+# nowcast.py
+"""Local statistical extension of the 3-hourly forecast past its five days, with prediction intervals.
+
+Additive Holt-Winters with a damped trend and a daily season (8 steps of 3 h), fitted to stored observations
+leading into the forecast followed by the forecast itself. Smoothing parameters are picked by one-step-ahead
+squared error over a small grid, evaluated for every grid point at once with NumPy, so a fit takes a few
+milliseconds on a CPU. Intervals use the ETS(A,Ad,A) forecast variance."""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+STEP = 3 * 3600
+SEASON = 24 * 3600 // STEP
+DAYS = 7
+MAX_HISTORY_DAYS = 7 # stored observations used ahead of the forecast
+PHI = 0.9 # trend damping; keeps a 2-day extension from running away with the last slope
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.01, 0.05, 0.1, 0.2)
+GAMMAS = (0.05, 0.1, 0.2, 0.4)
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600}
+HoltWinters = namedtuple('HoltWinters', 'level trend seasonal alpha beta gamma phi sigma n')
+def fit_holt_winters(y, season=SEASON, alphas=ALPHAS, betas=BETAS, gammas=GAMMAS, phi=PHI):
+    """Best additive damped Holt-Winters fit to a regularly spaced series (needs at least two seasons)"""
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n < 2 * season:
+        raise ValueError(f"need at least {2 * season} points, got {n}")
+    grid = np.array(np.meshgrid(alphas, betas, gammas, indexing='ij')).reshape(3, -1)
+    alpha, beta, gamma = grid
+    size = grid.shape[1]
+    level = np.full(size, y[:season].mean())
+    trend = np.full(size, (y[season:2 * season].mean() - y[:season].mean()) / season)
+    seasonal = np.tile(y[:season] - y[:season].mean(), (size, 1))
+    sse = np.zeros(size)
+    for t in range(n):
+        s = seasonal[:, t % season]
+        error = y[t] - (level + phi * trend + s)
+        sse += error * error
+        new_level = alpha * (y[t] - s) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        seasonal[:, t % season] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+    best = int(np.argmin(sse))
+    sigma = float(np.sqrt(sse[best] / max(1, n - 3)))
+    return HoltWinters(float(level[best]), float(trend[best]), seasonal[best].copy(),
+                       float(alpha[best]), float(beta[best]), float(gamma[best]), phi, sigma, n)
+def forecast_holt_winters(fit, horizon, z=Z_SCORES[0.8]):
+    """(mean, lower, upper) arrays for the next horizon steps after the fitted series"""
+    h = np.arange(1, horizon + 1)
+    damped = np.cumsum(fit.phi ** h)
+    season = len(fit.seasonal)
+    mean = fit.level + damped * fit.trend + fit.seasonal[(fit.n + h - 1) % season]
+    # c_j = alpha * (1 + beta * phi * (1 - phi^j) / (1 - phi)) + gamma * [j is a multiple of the season]
+    j = np.arange(1, horizon)
+    c = fit.alpha * (1 + fit.beta * fit.phi * (1 - fit.phi ** j) / (1 - fit.phi)) + fit.gamma * (j % season == 0)
+    variance = fit.sigma ** 2 * (1 + np.concatenate(([0.0], np.cumsum(c * c))))
+    spread = z * np.sqrt(variance)
+    return mean, mean - spread, mean + spread
+def leading_history(history, first_valid, max_days=MAX_HISTORY_DAYS):
+    """Stored observations (UTC 'time', 'temp') resampled onto the forecast's 3-hourly grid, oldest first.
+    Only the unbroken run of grid points right before the forecast is kept; each needs an observation within 3 h."""
+    if history is None or history.empty:
+        return np.zeros(0)
+    ts = history['time'].to_numpy().astype('datetime64[s]').astype('int64')
+    temps = history['temp'].to_numpy(dtype='float64')
+    grid = first_valid - STEP * np.arange(max_days * SEASON, 0, -1)
+    index = np.searchsorted(ts, grid)
+    after = ts[np.minimum(index, len(ts) - 1)]
+    before = ts[np.maximum(index - 1, 0)]
+    covered = np.minimum(np.abs(after - grid), np.abs(before - grid)) <= STEP
+    gaps = np.flatnonzero(~covered)
+    start = gaps[-1] + 1 if len(gaps) else 0
+    return np.interp(grid[start:], ts, temps)
+def nowcast(forecast, timezone_offset, history=None, days=DAYS, level=0.8, min_sigma=0.0):
+    """Forecast frame (local 'time', 'temp') extended to `days` days.
+
+    min_sigma floors the one-step error used for the interval - the provider forecast is smoother than reality,
+    so a fit to it alone understates uncertainty (the app passes the measured day-5 forecast error). Returns a frame of time (local), temp, lower, upper and source ('forecast' or 'nowcast'); the interval is
+    only set on nowcast rows. None when there are too few forecast steps to fit."""
+    if len(forecast) < 2 * SEASON:
+        return None
+    local = forecast['time'].to_numpy().astype('datetime64[s]').astype('int64')
+    temps = forecast['temp'].to_numpy(dtype='float64')
+    leading = leading_history(history, int(local[0]) - timezone_offset)
+    fit = fit_holt_winters(np.concatenate((leading, temps)))
+    fit = fit._replace(sigma=max(fit.sigma, min_sigma))
+    horizon = max(0, days * SEASON - len(forecast))
+    mean, lower, upper = forecast_holt_winters(fit, horizon, Z_SCORES[level])
+    extension = local[-1] + STEP * np.arange(1, horizon + 1)
+    nan = np.full(len(forecast), np.nan)
+    return pd.DataFrame({
+        'time': pd.to_datetime(np.concatenate((local, extension)), unit='s'),
+        'temp': np.concatenate((temps, mean)),
+        'lower': np.concatenate((nan, lower)),
+        'upper': np.concatenate((nan, upper)),
+        'source': pd.Categorical(['forecast'] * len(forecast) + ['nowcast'] * horizon, categories=['forecast', 'nowcast']),
+    })
+def daily_outlook(frame):
+    """Per local day: high, low, the widest interval half-width of its nowcast steps (NaN if none) and its main source"""
+    days = frame.assign(date=frame['time'].dt.normalize(), spread=frame['upper'] - frame['temp'])
+    grouped = days.groupby('date', sort=True)
+    outlook = pd.DataFrame({
+        'high': grouped['temp'].max(),
+        'low': grouped['temp'].min(),
+        'spread': grouped['spread'].max(),
+        'nowcast_share': grouped['source'].agg(lambda source: float((source == 'nowcast').mean())),
+    })
+    outlook['source'] = np.where(outlook['nowcast_share'] > 0.5, 'nowcast', 'forecast')
+    return outlook.drop(columns='nowcast_share')
@@ -0,0 +1,133 @@
+# prefetch.py
+"""Server-side refresh of hot locations shortly before their cache entries expire, so client reruns
+read a warm cache and upstream load follows the number of distinct locations rather than open tabs"""
+import os
+import random
+import threading
+import time
+
+from fetcher import ENDPOINTS, fetch_weather_bundle
+from rate_limit import TokenBucket, get_openweather_limiter
+from weather_cache import get_response_cache, snap
+from weather_service import get_weather_service
+
+HOT_WINDOW = 30 * 60 # a location stays hot this long after its last request
+REFRESH_MARGIN = 60 # refresh when an entry has less than this many seconds left...
+REFRESH_JITTER = 60 # ...plus a random 0..jitter, so entries fetched together don't expire together
+class PrefetchScheduler:
+    """Tracks recently requested locations and keeps their endpoints fresh within a per-minute call budget.
+    The budget is drawn with try_acquire: when it runs out the round stops, foreground requests are never delayed."""
+    def __init__(self, key, cache, budget_per_min=20, interval=15, jitter=REFRESH_JITTER, margin=REFRESH_MARGIN,
+                 hot_window=HOT_WINDOW, max_locations=100, global_limiter=None, clock=time.monotonic, rng=None):
+        self.key = key
+        self.cache = cache
+        self.budget = TokenBucket(rate=budget_per_min / 60, burst=max(1, int(budget_per_min / 6)), clock=clock)
+        self.global_limiter = global_limiter
+        self.interval = interval
+        self.jitter = jitter
+        self.margin = margin
+        self.hot_window = hot_window
+        self.max_locations = max_locations
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._hot = {} # (lat, lon) on the cache grid -> last requested (clock time)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refreshed = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def touch(self, lat, lon):
+        """Mark a location as requested; call on every foreground load"""
+        point = (snap(lat, self.cache.grid), snap(lon, self.cache.grid))
+        with self._lock:
+            self._hot.pop(point, None)
+            self._hot[point] = self._clock()
+            while len(self._hot) > self.max_locations:
+                del self._hot[next(iter(self._hot))] # least recently touched
+
+    def hot_locations(self):
+        cutoff = self._clock() - self.hot_window
+        with self._lock:
+            for point in [point for point, seen in self._hot.items() if seen < cutoff]:
+                del self._hot[point]
+            return list(self._hot)
+
+    def due(self):
+        """[(lat, lon, endpoints)] whose entries are missing or inside the (jittered) refresh margin"""
+        items = []
+        for lat, lon in self.hot_locations():
+            endpoints = []
+            for endpoint in ENDPOINTS:
+                remaining = self.cache.expires_in(self.cache.make_key(endpoint, lat, lon))
+                if remaining is None or remaining <= self.margin + self._rng.uniform(0, self.jitter):
+                    endpoints.append(endpoint)
+            if endpoints:
+                items.append((lat, lon, tuple(endpoints)))
+        return items
+
+    def _take_token(self):
+        if not self.budget.try_acquire():
+            return False
+        if self.global_limiter is None or self.global_limiter.try_acquire():
+            return True
+        self.budget.refund() # nothing was sent, so the budget token is still ours to spend
+        return False
+
+    def run_once(self):
+        """One refresh round; returns the number of endpoints fetched"""
+        items = self.due()
+        self._rng.shuffle(items)
+        fetched = 0
+        for index, (lat, lon, endpoints) in enumerate(items):
+            granted = []
+            for endpoint in endpoints:
+                if not self._take_token():
+                    break
+                granted.append(endpoint)
+            if granted:
+                fetch_weather_bundle(lat, lon, self.key, 'metric', tuple(granted), cache=self.cache, refresh=True)
+                fetched += len(granted)
+            if len(granted) < len(endpoints):
+                self.skipped += sum(len(item[2]) for item in items[index:]) - len(granted)
+                break
+        self.refreshed += fetched
+        return fetched
+
+    def _loop(self):
+        while not self._stop.wait(self.interval * self._rng.uniform(0.5, 1.5)):
+            try:
+                self.run_once()
+            except Exception:
+                self.errors += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="weather-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            hot = len(self._hot)
+        return {'hot_locations': hot, 'refreshed': self.refreshed, 'skipped': self.skipped, 'errors': self.errors}
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+def get_prefetcher():
+    """Process-wide scheduler, started on first use (PREFETCH_RATE_PER_MIN, default 20; 0 disables refreshing)"""
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                per_minute = float(os.getenv("PREFETCH_RATE_PER_MIN", "20"))
+                key = get_weather_service().openweather_key
+                scheduler = PrefetchScheduler(key, get_response_cache(), budget_per_min=max(per_minute, 0.001),
+                                              global_limiter=get_openweather_limiter())
+                if key and per_minute > 0:
+                    scheduler.start()
+                _prefetcher = scheduler
+    return _prefetcher
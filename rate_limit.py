@@ -0,0 +1,62 @@
+# rate_limit.py
+"""Thread-safe token bucket for upstream quotas"""
+import os
+import threading
+import time
+class TokenBucket:
+    """rate tokens per second, holding at most burst; acquire() blocks until a token is free"""
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def refund(self, tokens=1):
+        """Give back tokens taken but not spent (capped at burst)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.burst, self._tokens + tokens)
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; returns False if timeout (seconds) runs out first"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self._sleep(wait)
+_openweather_limiter = None
+_limiter_lock = threading.Lock()
+def get_openweather_limiter():
+    """Process-wide budget for OpenWeather calls (OPENWEATHER_RATE_PER_MIN, default 60 - the free tier)"""
+    global _openweather_limiter
+    if _openweather_limiter is None:
+        with _limiter_lock:
+            if _openweather_limiter is None:
+                per_minute = float(os.getenv("OPENWEATHER_RATE_PER_MIN", "60"))
+                _openweather_limiter = TokenBucket(rate=per_minute / 60, burst=max(1, int(per_minute / 6)))
+    return _openweather_limiter
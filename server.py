@@ -0,0 +1,106 @@
+# server.py
+"""Local JSON API over the headless weather service - same cache, store and connection pool as the Streamlit app.
+
+Usage: python server.py [--host 127.0.0.1] [--port 8502]
+  GET /weather?lat=40.71&lon=-74.01   metric WeatherSnapshot as JSON
+  GET /geocode?q=Paris                {lat, lon, full_loc}
+  GET /health
+  GET /metrics                        Prometheus text format
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+# before the local imports: storage, cache, IP and history settings are read from the environment at import time
+load_dotenv()
+from http_client import get_http_client
+from metrics import REGISTRY
+from prefetch import get_prefetcher
+from weather_cache import get_response_cache
+from weather_service import get_weather_service, snapshot_to_dict
+class WeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def send_body(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status, body):
+        self.send_body(status, json.dumps(body, ensure_ascii=False).encode(), "application/json; charset=utf-8")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        route = {'/weather': self.weather, '/geocode': self.geocode, '/health': self.health, '/metrics': self.metrics}.get(url.path)
+        if route is None:
+            self.send_json(404, {'error': f"Unknown path {url.path}"})
+            return
+        try:
+            route(query)
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def weather(self, query):
+        try:
+            lat, lon = float(query['lat']), float(query['lon'])
+        except (KeyError, ValueError):
+            self.send_json(400, {'error': "lat and lon query parameters are required"})
+            return
+        if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+            self.send_json(400, {'error': "lat must be within -90..90 and lon within -180..180"})
+            return
+        result = get_weather_service().get_weather(lat, lon)
+        if result.snapshot is None:
+            self.send_json(502, {'errors': result.errors, 'warnings': result.warnings})
+            return
+        get_prefetcher().touch(lat, lon)
+        self.send_json(200, {**snapshot_to_dict(result.snapshot), 'warnings': result.warnings})
+
+    def geocode(self, query):
+        if not query.get('q'):
+            self.send_json(400, {'error': "q query parameter is required"})
+            return
+        result = get_weather_service().geocode(query['q'])
+        if result.lat is None:
+            self.send_json(404, {'error': "Location not found", 'warnings': result.warnings})
+            return
+        self.send_json(200, {'lat': result.lat, 'lon': result.lon, 'full_loc': result.full_loc, 'warnings': result.warnings})
+
+    def metrics(self, query):
+        # Touch the lazily created caches so their collectors are registered before the first scrape
+        get_response_cache()
+        self.send_body(200, REGISTRY.render().encode(), "text/plain; version=0.0.4; charset=utf-8")
+
+    def health(self, query):
+        self.send_json(200, {
+            'openweather_key': bool(get_weather_service().openweather_key),
+            'http_hosts': get_http_client().hosts(),
+            'response_cache': get_response_cache().stats(),
+            'prefetch': get_prefetcher().stats(),
+        })
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), WeatherHandler)
+    print(f"Serving weather API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        get_prefetcher().stop()
+        get_http_client().close()
+if __name__ == "__main__":
+    main()
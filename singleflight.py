@@ -0,0 +1,36 @@
+# singleflight.py
+"""Request coalescing - concurrent callers asking for the same key share one in-flight future"""
+import threading
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def submit(self, key, executor, fn, *args):
+        """Return the in-flight future for key, or start fn(*args) on executor and register it"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            future = executor.submit(fn, *args)
+            self._inflight[key] = future
+            self.leaders += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def get(self, key):
+        """The in-flight future for key, or None"""
+        with self._lock:
+            return self._inflight.get(key)
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'leaders': self.leaders, 'shared': self.shared, 'inflight': len(self._inflight)}
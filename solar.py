@@ -0,0 +1,108 @@
+# solar.py
+"""Deterministic UV index and pollen estimates, vectorized over a whole time series.
+
+UV comes from the sun's elevation at the location and time (NOAA low-precision solar position) scaled by
+cloud cover. Pollen uses the same temperature / humidity heuristics as before, evaluated on arrays. Hourly
+curves spanning the current conditions and the 3-hourly forecast are memoized per (location, hour), so every
+view and rerun in that hour shares one computation."""
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pandas as pd
+
+from weather_cache import snap
+
+UV_CLEAR_SKY = 12.5 # clear-sky UV index with the sun overhead, UVI ≈ 12.5 * sin(elevation)^2.42
+UV_EXPONENT = 2.42
+CLOUD_UV_DAMPING = 0.75 # overcast sky lets through about a quarter of the clear-sky UV
+CURVE_GRID = 0.01
+def solar_elevation(lat, lon, ts):
+    """Sun elevation in degrees for UTC epoch seconds ts (scalars or arrays); accurate to ~0.5°"""
+    ts = np.asarray(ts, dtype='float64')
+    days = ts / 86400 - 10957.5 # days since J2000.0
+    mean_longitude = np.radians((280.460 + 0.9856474 * days) % 360)
+    anomaly = np.radians((357.528 + 0.9856003 * days) % 360)
+    ecliptic = mean_longitude + np.radians(1.915 * np.sin(anomaly) + 0.020 * np.sin(2 * anomaly))
+    obliquity = np.radians(23.439 - 0.0000004 * days)
+    declination = np.arcsin(np.sin(obliquity) * np.sin(ecliptic))
+    right_ascension = np.arctan2(np.cos(obliquity) * np.sin(ecliptic), np.cos(ecliptic))
+    sidereal = np.radians((280.46061837 + 360.98564736629 * days) % 360)
+    hour_angle = sidereal + np.radians(lon) - right_ascension
+    lat = np.radians(lat)
+    sin_elevation = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1, 1)))
+def uv_index(elevation, clouds):
+    """UV index from sun elevation (degrees) and cloud cover (%); 0 with the sun below the horizon"""
+    sin_elevation = np.clip(np.sin(np.radians(elevation)), 0, None)
+    cover = np.clip(np.asarray(clouds, dtype='float64') / 100, 0, 1)
+    return UV_CLEAR_SKY * sin_elevation ** UV_EXPONENT * (1 - CLOUD_UV_DAMPING * cover ** 3.4)
+def uv_level(uv):
+    return 'Low' if uv < 3 else 'Moderate' if uv < 6 else 'High' if uv < 8 else 'Very High' if uv < 11 else 'Extreme'
+def pollen_indices(temp, humidity):
+    """{'tree', 'grass', 'weed', 'overall'} arrays on a 0-10 scale from °C temperature and % humidity"""
+    temp = np.asarray(temp, dtype='float64')
+    humidity = np.asarray(humidity, dtype='float64')
+    tree = np.clip((temp - 5) * 0.5 - humidity * 0.05, 0, 10)
+    grass = np.clip(np.where(temp > 15, (temp - 10) * 0.4, 0), 0, 10)
+    weed = np.clip(np.where(temp > 20, (30 - humidity) * 0.2, 0), 0, 10)
+    return {'tree': tree, 'grass': grass, 'weed': weed, 'overall': (tree + grass + weed) / 3}
+def exposure_curve(lat, lon, current, forecast):
+    """Hourly UV and pollen from the current hour to the end of the forecast.
+
+    Cloud cover, temperature and humidity are interpolated between the current observation and the
+    3-hourly forecast steps. 'time' is location-local like the forecast frame."""
+    anchors = np.array([current.observed_at], dtype='int64')
+    clouds, temps, humidity = [current.clouds], [current.temp], [current.humidity]
+    if not forecast.empty:
+        valid = forecast['time'].to_numpy().astype('datetime64[s]').astype('int64') - current.timezone
+        later = valid > current.observed_at
+        anchors = np.concatenate((anchors, valid[later]))
+        clouds = np.concatenate((clouds, forecast['clouds'].to_numpy()[later]))
+        temps = np.concatenate((temps, forecast['temp'].to_numpy()[later]))
+        humidity = np.concatenate((humidity, forecast['humidity'].to_numpy()[later]))
+    hours = np.arange(current.observed_at // 3600 * 3600, anchors[-1] + 1, 3600)
+    hourly_clouds = np.interp(hours, anchors, clouds)
+    elevation = solar_elevation(lat, lon, hours)
+    pollen = pollen_indices(np.interp(hours, anchors, temps), np.interp(hours, anchors, humidity))
+    return pd.DataFrame({
+        'time': pd.to_datetime(hours + current.timezone, unit='s'),
+        'elevation': elevation,
+        'clouds': hourly_clouds,
+        'uv': uv_index(elevation, hourly_clouds),
+        **pollen,
+    })
+class ExposureCache:
+    """exposure_curve results memoized per (snapped location, hour of the observation)"""
+    def __init__(self, max_entries=256, grid=CURVE_GRID):
+        self.max_entries = max_entries
+        self.grid = grid
+        self._curves = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lat, lon, current, forecast):
+        key = (snap(lat, self.grid), snap(lon, self.grid), current.observed_at // 3600)
+        with self._lock:
+            curve = self._curves.get(key)
+            if curve is not None:
+                self._curves.move_to_end(key)
+                self.hits += 1
+                return curve
+            self.misses += 1
+        curve = exposure_curve(lat, lon, current, forecast)
+        with self._lock:
+            self._curves[key] = curve
+            while len(self._curves) > self.max_entries:
+                self._curves.popitem(last=False)
+        return curve
+_cache = None
+_cache_lock = threading.Lock()
+def get_exposure_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExposureCache()
+    return _cache
@@ -0,0 +1,147 @@
+# storage.py
+"""Persistent SQLite store for geocodes, raw OpenWeather payloads and favorites"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.getenv("WEATHER_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_app.db"))
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    query TEXT PRIMARY KEY,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    full_loc TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    endpoint TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    units TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (endpoint, lat, lon, units)
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    lat REAL,
+    lon REAL,
+    PRIMARY KEY (user_id, name)
+);
+"""
+# Columns added after a table first shipped; applied once to older databases via PRAGMA user_version
+MIGRATIONS = (
+    "ALTER TABLE favorites ADD COLUMN lat REAL; ALTER TABLE favorites ADD COLUMN lon REAL;",
+)
+def normalize_query(query):
+    return " ".join(query.lower().split())
+class WeatherStore:
+    """WAL-mode SQLite with one connection per thread, so concurrent script runs don't share a lock"""
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                fresh = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'favorites'").fetchone()[0] == 0
+                conn.executescript(SCHEMA)
+                version = len(MIGRATIONS) if fresh else conn.execute("PRAGMA user_version").fetchone()[0]
+                for migration in MIGRATIONS[version:]:
+                    conn.executescript(migration)
+                conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+                self._schema_ready = True
+
+    def ping(self):
+        self._connect().execute("SELECT 1").fetchone()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # Geocoding
+    def get_geocode(self, query):
+        row = self._connect().execute(
+            "SELECT lat, lon, full_loc FROM geocode WHERE query = ?", (normalize_query(query),)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def list_geocodes(self):
+        """Every stored (query, lat, lon, full_loc), for warming the in-memory index"""
+        return [tuple(row) for row in self._connect().execute("SELECT query, lat, lon, full_loc FROM geocode")]
+
+    def save_geocode(self, query, lat, lon, full_loc):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO geocode (query, lat, lon, full_loc, created_at) VALUES (?, ?, ?, ?, ?)",
+            (normalize_query(query), lat, lon, full_loc, time.time())
+        )
+
+    # Raw OpenWeather payloads
+    def get_payload(self, endpoint, lat, lon, units, max_age=None):
+        """Return (payload, fetched_at) or None when missing or older than max_age seconds"""
+        row = self._connect().execute(
+            "SELECT payload, fetched_at FROM payloads WHERE endpoint = ? AND lat = ? AND lon = ? AND units = ?",
+            (endpoint, lat, lon, units)
+        ).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def save_payload(self, endpoint, lat, lon, units, payload, fetched_at=None):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO payloads (endpoint, lat, lon, units, fetched_at, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            (endpoint, lat, lon, units, fetched_at or time.time(), json.dumps(payload, separators=(',', ':')))
+        )
+
+    # Favorites
+    def list_favorites(self, user_id):
+        """[{'name', 'lat', 'lon'}] in insertion order; lat/lon are None for entries saved before coordinates were kept"""
+        rows = self._connect().execute(
+            "SELECT name, lat, lon FROM favorites WHERE user_id = ? ORDER BY created_at", (user_id,)
+        ).fetchall()
+        return [{'name': name, 'lat': lat, 'lon': lon} for name, lat, lon in rows]
+
+    def add_favorite(self, user_id, name, lat=None, lon=None):
+        self._connect().execute(
+            "INSERT OR IGNORE INTO favorites (user_id, name, created_at, lat, lon) VALUES (?, ?, ?, ?, ?)",
+            (user_id, name, time.time(), lat, lon)
+        )
+
+    def update_favorite_coords(self, user_id, name, lat, lon):
+        self._connect().execute(
+            "UPDATE favorites SET lat = ?, lon = ? WHERE user_id = ? AND name = ?", (lat, lon, user_id, name)
+        )
+
+    def remove_favorite(self, user_id, name):
+        self._connect().execute("DELETE FROM favorites WHERE user_id = ? AND name = ?", (user_id, name))
+_store = None
+_store_lock = threading.Lock()
+def get_store():
+    """Process-wide store; connections are still opened per thread"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WeatherStore()
+    return _store
@@ -0,0 +1,6 @@
+# tests/conftest.py
+"""Run the tests against the top-level modules of the checkout"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
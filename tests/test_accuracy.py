@@ -0,0 +1,46 @@
+# tests/test_accuracy.py
+import accuracy
+from accuracy import LEAD_BUCKET, AccuracyTracker
+from forecast_frame import build_forecast_frame, daily_summary
+from history_store import HistoryStore
+from models import CurrentConditions, WeatherSnapshot
+
+LAT, LON = 40.71, -74.01
+ISSUED = 1700000000
+def make_snapshot(observed_at, temp, forecast_temp=20.0, steps=40):
+    weather = [{'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}]
+    current = CurrentConditions.from_payload({'dt': observed_at, 'timezone': 0, 'main': {'temp': temp}, 'weather': weather})
+    forecast = build_forecast_frame({'city': {'timezone': 0}, 'list': [
+        {'dt': observed_at + i * LEAD_BUCKET, 'main': {'temp': forecast_temp}, 'weather': weather} for i in range(steps)]})
+    return WeatherSnapshot(current=current, forecast=forecast, daily=daily_summary(forecast), aqi=1, pollen={}, alerts=())
+def make_tracker(tmp_path):
+    store = HistoryStore(root=str(tmp_path), forecast_interval=0)
+    return AccuracyTracker(store=store, path=str(tmp_path / 'accuracy.json'))
+def test_snapshot_is_pending_once(tmp_path, monkeypatch):
+    tracker = make_tracker(tmp_path)
+    monkeypatch.setattr(accuracy.time, 'time', lambda: ISSUED + 60)
+    tracker.record_snapshot(LAT, LON, make_snapshot(ISSUED, 20.0))
+    assert len(tracker._pending[tracker.store.location_dir(LAT, LON)]) == 1
+def test_next_observation_is_scored_once(tmp_path, monkeypatch):
+    tracker = make_tracker(tmp_path)
+    monkeypatch.setattr(accuracy.time, 'time', lambda: ISSUED + 60)
+    tracker.record_snapshot(LAT, LON, make_snapshot(ISSUED, 20.0))
+    observed_at = ISSUED + 4 * 3600
+    monkeypatch.setattr(accuracy.time, 'time', lambda: observed_at + 60)
+    assert tracker.record_snapshot(LAT, LON, make_snapshot(observed_at, 21.0)) == 1
+    summary = tracker.summary(LAT, LON)
+    assert summary['count'] == 1
+    assert summary['mae'] == 1.0
+    assert summary['bias'] == -1.0
+def test_reloaded_tracker_does_not_rescore(tmp_path, monkeypatch):
+    tracker = make_tracker(tmp_path)
+    monkeypatch.setattr(accuracy.time, 'time', lambda: ISSUED + 60)
+    tracker.record_snapshot(LAT, LON, make_snapshot(ISSUED, 20.0))
+    observed_at = ISSUED + 4 * 3600
+    monkeypatch.setattr(accuracy.time, 'time', lambda: observed_at + 60)
+    tracker.record_snapshot(LAT, LON, make_snapshot(observed_at, 21.0))
+    # same lead bucket after a restart: the watermark keeps the first snapshot from being scored again
+    reloaded = AccuracyTracker(store=tracker.store, path=tracker.path)
+    monkeypatch.setattr(accuracy.time, 'time', lambda: observed_at + 1860)
+    reloaded.record_snapshot(LAT, LON, make_snapshot(observed_at + 1800, 21.0))
+    assert reloaded.summary(LAT, LON)['count'] == 2
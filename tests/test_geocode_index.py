@@ -0,0 +1,33 @@
+# tests/test_geocode_index.py
+import pytest
+
+from geocode_index import GeocodeIndex, qualifier_tokens
+@pytest.fixture(scope='module')
+def cities():
+    index = GeocodeIndex()
+    index.load_cities()
+    return index
+@pytest.mark.parametrize('query', ["Athens, GA", "Sydney, CA", "Birmingham, US", "Melbourne, US", "Valencia, VE", "Perth, UK"])
+def test_qualifier_for_another_country_misses(cities, query):
+    assert cities.lookup(query) is None
+@pytest.mark.parametrize('query, expected', [
+    ("Paris", 'Paris, FR'),
+    ("paris,  fr", 'Paris, FR'),
+    ("Londn", 'London, GB'),
+    ("Santiago", 'Santiago, CL'),
+])
+def test_exact_and_misspelt_names_resolve(cities, query, expected):
+    assert cities.lookup(query)[2] == expected
+def test_bare_prefix_does_not_resolve(cities):
+    assert cities.lookup("Sant") is None
+    assert 'Santiago, CL' in {entry[2] for _, entry in cities.prefix("Sant")}
+def test_coordinates_are_never_indexed():
+    index = GeocodeIndex()
+    index.add("40.7,-74.0", 40.7, -74.0, "New York, US")
+    assert len(index) == 0
+    assert index.lookup("40.7,74.0") is None
+    assert index.lookup("40.7,-74.0") is None
+def test_qualifier_tokens():
+    assert qualifier_tokens("Athens, GA") == {'ga'}
+    assert qualifier_tokens("Perth UK") == {'uk'}
+    assert qualifier_tokens("New York") == set()
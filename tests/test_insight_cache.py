@@ -0,0 +1,72 @@
+# tests/test_insight_cache.py
+import threading
+
+from insight_cache import InsightCache, NotCached, make_insight_key, temp_bucket
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+def wait_for_refresh(cache):
+    cache._executor.submit(lambda: None).result() # max_workers=1: queued after the refresh
+def make_cache(clock):
+    return InsightCache(ttl=60, max_workers=1, clock=clock)
+def test_fresh_entry_is_served_without_computing():
+    cache = make_cache(FakeClock())
+    assert cache.get_or_compute('k', lambda: "tip") == "tip"
+    assert cache.get_or_compute('k', lambda: "other") == "tip"
+    assert cache.stats()['hits'] == 1
+def test_fallback_is_never_stored():
+    cache = make_cache(FakeClock())
+    assert cache.get_or_compute('k', lambda: NotCached("fallback")) == "fallback"
+    assert cache.stats()['entries'] == 0
+    assert cache.get_or_compute('k', lambda: "tip") == "tip"
+    assert cache.stats()['misses'] == 2
+def test_stale_entry_is_kept_when_refresh_falls_back():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get_or_compute('k', lambda: "tip")
+    clock.now = 120
+    assert cache.get_or_compute('k', lambda: NotCached("fallback")) == "tip"
+    wait_for_refresh(cache)
+    assert cache.get_or_compute('k', lambda: NotCached("fallback")) == "tip"
+    assert cache.stats()['entries'] == 1
+def test_stale_entry_is_replaced_by_refresh():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get_or_compute('k', lambda: "old")
+    clock.now = 120
+    assert cache.get_or_compute('k', lambda: "new") == "old"
+    wait_for_refresh(cache)
+    assert cache.get_or_compute('k', lambda: "newer") == "new"
+def test_one_refresh_per_stale_key():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get_or_compute('k', lambda: "old")
+    clock.now = 120
+    release = threading.Event()
+    calls = []
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+    for _ in range(5):
+        assert cache.get_or_compute('k', compute) == "old"
+    release.set()
+    wait_for_refresh(cache)
+    assert len(calls) == 1
+def test_refresh_error_is_shown_once_on_a_foreground_read():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get_or_compute('k', lambda: "tip")
+    clock.now = 120
+    def compute():
+        raise RuntimeError("provider down")
+    assert cache.get_or_compute('k', compute) == "tip"
+    wait_for_refresh(cache)
+    assert cache.take_errors() == ["AI insight refresh failed: provider down"]
+    assert cache.take_errors() == []
+def test_keys_share_a_temperature_bucket():
+    assert temp_bucket(20.3) == temp_bucket(21.9) == 20
+    assert make_insight_key(" New  York ", "Rain", 20.3, 'metric') == make_insight_key("new york", "rain", 21.9, 'metric')
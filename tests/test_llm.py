@@ -0,0 +1,91 @@
+# tests/test_llm.py
+import threading
+
+from llm import FALLBACK_INSIGHT, CircuitBreaker, LLMRouter
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+def open_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=clock)
+    for _ in range(3):
+        breaker.record_failure(RuntimeError("down"))
+    return breaker
+def test_breaker_opens_after_threshold():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+def test_half_open_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 60
+    assert [breaker.allow() for _ in range(5)] == [True, False, False, False, False]
+def test_half_open_trial_from_concurrent_callers():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 60
+    start = threading.Barrier(8)
+    results = []
+    def caller():
+        start.wait()
+        results.append(breaker.allow())
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
+def test_trial_outcome_closes_or_reopens():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+    breaker = open_breaker(clock)
+    clock.now = 120
+    assert breaker.allow()
+    assert breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == 'open'
+def test_abandoned_trial_is_retried_after_reset_timeout():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+    clock.now = 60
+    assert breaker.allow()
+    clock.now = 90
+    assert not breaker.allow()
+    clock.now = 120
+    assert breaker.allow()
+class StalledProvider:
+    """Blocks until the router closes its stream, like a provider that never sends a first token"""
+    name = 'stalled'
+    label = 'Stalled'
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def stream(self, prompt, opened=None):
+        opened(self.closed.set)
+        self.closed.wait(10)
+        raise ConnectionError("stream closed")
+        yield
+class FastProvider:
+    name = 'fast'
+    label = 'Fast'
+
+    def stream(self, prompt, opened=None):
+        yield "Take an umbrella."
+def test_hedged_race_closes_the_loser_without_failing_it():
+    stalled = StalledProvider()
+    errors = []
+    router = LLMRouter([stalled, FastProvider()], on_error=lambda provider, e: errors.append(e), hedge_delay=0.05)
+    assert router.complete("rain") == "Take an umbrella."
+    assert stalled.closed.wait(1)
+    assert router.breakers['stalled'].failures == 0
+    assert errors == []
+def test_no_provider_falls_back():
+    assert LLMRouter([]).complete("rain") == FALLBACK_INSIGHT.strip()
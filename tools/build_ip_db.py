@@ -0,0 +1,42 @@
+# tools/build_ip_db.py
+"""Build the memory-mapped IPv4 range table read by ip_locator.MmapIPDatabase.
+
+Input is a DB-IP "IP to City Lite" style CSV without a header:
+  ip_start,ip_end,continent,country,stateprov,city,latitude,longitude
+IPv6 rows are skipped.
+
+Usage: python tools/build_ip_db.py dbip-city-lite.csv [--out data/ip_ranges.bin]
+"""
+import argparse
+import csv
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ip_locator import DEFAULT_DB_PATH, MmapIPDatabase, write_database
+def read_ranges(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='', encoding='utf-8') as handle:
+        for row in csv.reader(handle):
+            if len(row) < 8 or ':' in row[0]:
+                continue
+            start, end, _, country, _, city, lat, lon = row[:8]
+            label = f"{city}, {country}" if city else country
+            yield start, end, float(lat), float(lon), label
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv")
+    parser.add_argument("--out", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = write_database(read_ranges(args.csv), args.out)
+    print(f"Wrote {count} ranges to {args.out} ({os.path.getsize(args.out) / 1024 / 1024:.1f} MiB) "
+          f"in {time.perf_counter() - start:.1f} s")
+    database = MmapIPDatabase(args.out)
+    print(f"Check: {len(database)} ranges readable")
+    database.close()
+if __name__ == "__main__":
+    main()
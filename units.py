@@ -0,0 +1,16 @@
+# units.py
+"""Render-time unit conversion - data is fetched and stored in metric, converted only for display.
+Every converter accepts scalars, numpy arrays or pandas Series."""
+TEMP_SYMBOLS = {'metric': '°C', 'imperial': '°F'}
+SPEED_SYMBOLS = {'metric': 'm/s', 'imperial': 'mph'}
+MPS_TO_MPH = 2.2369362920544
+def temp_symbol(unit):
+    return TEMP_SYMBOLS.get(unit, '°C')
+def speed_symbol(unit):
+    return SPEED_SYMBOLS.get(unit, 'm/s')
+def convert_temp(celsius, unit):
+    """°C -> display unit"""
+    return celsius * 9 / 5 + 32 if unit == 'imperial' else celsius
+def convert_speed(mps, unit):
+    """m/s -> display unit"""
+    return mps * MPS_TO_MPH if unit == 'imperial' else mps
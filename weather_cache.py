@@ -0,0 +1,153 @@
+# weather_cache.py
+"""Process-wide TTL + LRU cache for OpenWeather responses, shared by all sessions and backed by SQLite"""
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+from metrics import REGISTRY
+from storage import get_store
+
+# Seconds each endpoint's payload stays fresh
+DEFAULT_TTLS = {
+    'current': 5 * 60,
+    'forecast': 30 * 60,
+    'air_quality': 60 * 60,
+}
+DEFAULT_GRID = float(os.getenv("WEATHER_CACHE_GRID", "0.01")) # degrees, ~1 km
+DEFAULT_MAX_BYTES = int(float(os.getenv("WEATHER_CACHE_MAX_MB", "64")) * 1024 * 1024)
+def snap(value, grid=DEFAULT_GRID):
+    """Round a coordinate onto the cache grid"""
+    return round(round(value / grid) * grid, 6)
+def estimate_size(value):
+    try:
+        return len(json.dumps(value, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return 1024
+class ResponseCache:
+    """LRU ordered dict of (endpoint, lat, lon, units) -> payload with per-endpoint TTLs and a byte budget"""
+    def __init__(self, ttls=None, grid=DEFAULT_GRID, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic, backing=None):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.grid = grid
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries = OrderedDict() # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self.backing = backing # optional persistent tier, e.g. storage.WeatherStore
+        self.backing_hits = 0
+
+    def make_key(self, endpoint, lat, lon, units='metric'):
+        return (endpoint, snap(lat, self.grid), snap(lon, self.grid), units)
+
+    def get(self, key):
+        endpoint = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+        value = self._load_from_backing(key)
+        with self._lock:
+            counter = self.hits if value is not None else self.misses
+            counter[endpoint] = counter.get(endpoint, 0) + 1
+        return value
+
+    def expires_in(self, key):
+        """Seconds until key expires in the memory tier (negative once stale), or None when it isn't held"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0] - self._clock()
+
+    def _load_from_backing(self, key):
+        """Warm the memory tier from the persistent store after a restart"""
+        if self.backing is None:
+            return None
+        ttl = self.ttls.get(key[0], 300)
+        try:
+            found = self.backing.get_payload(*key, max_age=ttl)
+        except Exception:
+            return None
+        if found is None:
+            return None
+        value, fetched_at = found
+        self.backing_hits += 1
+        self.set(key, value, ttl=ttl - (time.time() - fetched_at), persist=False)
+        return value
+
+    def set(self, key, value, ttl=None, persist=True):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = self._clock() + (ttl if ttl is not None else self.ttls.get(key[0], 300))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        if persist and self.backing is not None:
+            try:
+                self.backing.save_payload(*key, value)
+            except Exception:
+                pass
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'evictions': self.evictions,
+                'backing_hits': self.backing_hits,
+                'by_endpoint': {
+                    endpoint: {'hits': self.hits.get(endpoint, 0), 'misses': self.misses.get(endpoint, 0)}
+                    for endpoint in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+def cache_metrics(cache):
+    """Scrape-time metric families for a ResponseCache"""
+    stats = cache.stats()
+    by_endpoint = stats['by_endpoint']
+    return [
+        ('weather_response_cache_hits_total', 'counter', 'Response cache hits (memory or SQLite tier)',
+         [({'endpoint': endpoint}, counts['hits']) for endpoint, counts in by_endpoint.items()]),
+        ('weather_response_cache_misses_total', 'counter', 'Response cache misses that went upstream',
+         [({'endpoint': endpoint}, counts['misses']) for endpoint, counts in by_endpoint.items()]),
+        ('weather_response_cache_entries', 'gauge', 'Entries held in memory', [({}, stats['entries'])]),
+        ('weather_response_cache_bytes', 'gauge', 'Estimated bytes held in memory', [({}, stats['bytes'])]),
+        ('weather_response_cache_evictions_total', 'counter', 'LRU evictions', [({}, stats['evictions'])]),
+    ]
+_cache = None
+_cache_lock = threading.Lock()
+def get_response_cache():
+    """Process-wide cache shared by every script run"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(backing=get_store())
+                REGISTRY.register_collector(lambda: cache_metrics(_cache))
+    return _cache
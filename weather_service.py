@@ -0,0 +1,205 @@
+# weather_service.py
+"""Headless weather data layer - geocoding, the OpenWeather bundle and derived pollen/alerts, with no Streamlit dependency.
+Problems are returned as values (errors/warnings lists) so any front end can decide how to show them."""
+from collections import namedtuple
+import dataclasses
+import json
+import os
+import threading
+
+from accuracy import get_accuracy_tracker
+from fetcher import fetch_current_batch, fetch_weather_bundle
+from forecast_frame import build_forecast_frame, daily_summary
+from geocode_index import get_geocode_index
+from http_client import http_get
+from metrics import timed_operation
+from models import CurrentConditions, WeatherSnapshot
+from rate_limit import get_openweather_limiter
+from solar import pollen_indices
+from storage import get_store
+from weather_cache import get_response_cache
+
+GEOCODE_URL = "https://api.openweathermap.org/geo/1.0/direct"
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+# snapshot is None whenever errors is non-empty; warnings flag partial data
+WeatherResult = namedtuple('WeatherResult', ['snapshot', 'errors', 'warnings'])
+GeocodeResult = namedtuple('GeocodeResult', ['lat', 'lon', 'full_loc', 'warnings'])
+def openweather_key_from_env():
+    return (os.getenv("OPENWEATHER_API_KEY") or
+            os.getenv("OpenWeatherMap") or
+            os.getenv("WEATHER_API_KEY"))
+def simulate_pollen_data(current):
+    """Pollen estimate for the current conditions (metric CurrentConditions); see solar.pollen_indices"""
+    return {name: round(float(value), 1) for name, value in pollen_indices(current.temp, current.humidity).items()}
+def get_weather_alerts(current):
+    """Generate weather alerts based on conditions (metric CurrentConditions)"""
+    alerts = []
+    temp_c = current.temp
+    condition = current.condition.lower()
+    wind_kmh = current.wind_speed * 3.6 # m/s to km/h
+
+    if temp_c > 32:
+        alerts.append("🌡️ Heat Warning: Temperatures above 32°C – risk of heatstroke.")
+    if temp_c < -5:
+        alerts.append("❄️ Freezing Warning: Below -5°C – frostbite and icy roads possible.")
+    if wind_kmh > 40:
+        alerts.append("💨 High Wind Warning: Gusts over 40 km/h – secure outdoor items.")
+    if 'thunder' in condition or 'storm' in condition:
+        alerts.append("⚡ Thunderstorm Alert: Lightning and heavy rain expected.")
+    if condition in ['rain', 'drizzle'] and current.humidity > 80:
+        alerts.append("🌧️ Heavy Rain Advisory: Flooding risk in low areas.")
+
+    return alerts
+def snapshot_to_dict(snapshot):
+    """JSON-ready view of a WeatherSnapshot (all values metric)"""
+    return {
+        'current': dataclasses.asdict(snapshot.current),
+        'forecast': json.loads(snapshot.forecast.to_json(orient='records', date_format='iso')),
+        'daily': json.loads(snapshot.daily.reset_index().to_json(orient='records', date_format='iso')),
+        'aqi': snapshot.aqi,
+        'pollen': snapshot.pollen,
+        'alerts': list(snapshot.alerts),
+    }
+class WeatherService:
+    """Shares the process-wide HTTP pool, response cache, store and OpenWeather rate limit with every caller"""
+    def __init__(self, openweather_key=None):
+        self.openweather_key = openweather_key or openweather_key_from_env()
+        self.geocode_lock = threading.Lock() # Nominatim allows one request at a time per client
+
+    def geocode(self, query):
+        """In-memory index (exact, then fuzzy), then the store, then OpenWeather, then Nominatim;
+        lat/lon are None when nothing matched. Network results are added to the index."""
+        with timed_operation('geocode') as op:
+            result, op['outcome'] = self._geocode(query)
+        return result
+
+    def _geocode(self, query):
+        """(GeocodeResult, source that answered)"""
+        warnings = []
+        index = get_geocode_index()
+        found = index.lookup(query)
+        if found:
+            return GeocodeResult(*found, warnings), 'index'
+        store = get_store()
+        cached = store.get_geocode(query)
+        if cached:
+            index.add(query, *cached)
+            return GeocodeResult(*cached, warnings), 'store'
+
+        if self.openweather_key:
+            try:
+                resp = http_get(GEOCODE_URL, params={'q': query, 'limit': 1, 'appid': self.openweather_key}, timeout=10)
+                if resp.status_code == 200:
+                    data = resp.json()
+                    if data:
+                        item = data[0]
+                        full_loc = f"{item['name']}, {item.get('state', '')}, {item.get('country', '')}".strip(", ")
+                        store.save_geocode(query, item['lat'], item['lon'], full_loc)
+                        index.add(query, item['lat'], item['lon'], full_loc)
+                        return GeocodeResult(item['lat'], item['lon'], full_loc, warnings), 'openweather'
+            except Exception as e:
+                warnings.append(f"OpenWeather geocoding failed: {e}")
+
+        try:
+            with self.geocode_lock:
+                resp = http_get(NOMINATIM_URL, params={'q': query, 'format': 'json', 'limit': 1}, timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+            if data:
+                item = data[0]
+                lat, lon = float(item['lat']), float(item['lon'])
+                full_loc = ', '.join(part.strip() for part in item['display_name'].split(',')[-3:])
+                store.save_geocode(query, lat, lon, full_loc)
+                index.add(query, lat, lon, full_loc)
+                return GeocodeResult(lat, lon, full_loc, warnings), 'nominatim'
+        except Exception as e:
+            warnings.append(f"Nominatim geocoding failed: {e}")
+
+        return GeocodeResult(None, None, None, warnings), 'not_found'
+
+    def suggest(self, query, limit=5):
+        """Known locations starting with query, for type-ahead; close spellings when nothing starts with it"""
+        index = get_geocode_index()
+        matches = index.prefix(query, limit) or index.fuzzy(query, limit=limit)
+        return list(dict.fromkeys(entry[2] for _, entry in matches))
+
+    def get_weather(self, lat, lon):
+        """Current, forecast and air quality for one location as a metric WeatherSnapshot"""
+        with timed_operation('weather') as op:
+            result = self._get_weather(lat, lon)
+            op['outcome'] = 'error' if result.snapshot is None else 'partial' if result.warnings else 'ok'
+        if result.snapshot is not None:
+            try:
+                get_accuracy_tracker().record_snapshot(lat, lon, result.snapshot)
+            except OSError:
+                pass # history is best effort; a read-only disk must not fail the fetch
+        return result
+
+    def _get_weather(self, lat, lon):
+        errors, warnings = [], []
+        if not self.openweather_key:
+            return WeatherResult(None, ["OpenWeather API key not found. Please check your .env file."], warnings)
+        try:
+            # Always metric - the display unit is applied at render time so both units share one cache entry
+            results = fetch_weather_bundle(lat, lon, self.openweather_key, 'metric',
+                                           cache=get_response_cache(), limiter=get_openweather_limiter())
+
+            current_res = results['current']
+            if current_res.error:
+                raise current_res.error
+            if current_res.status_code != 200:
+                return WeatherResult(None, [f"Current weather fetch failed: {current_res.status_code}"], warnings)
+            current_payload = current_res.payload
+            if 'cod' in current_payload and current_payload['cod'] != 200:
+                return WeatherResult(None, [f"API Error: {current_payload.get('message', 'Unknown')}"], warnings)
+            current = CurrentConditions.from_payload(current_payload)
+
+            forecast_res = results['forecast']
+            if forecast_res.status_code != 200:
+                warnings.append("Forecast fetch partial failure - using current data only.")
+                forecast = {'list': [], 'cod': "200"}
+            else:
+                forecast = forecast_res.payload
+                if 'cod' in forecast and forecast['cod'] != "200":
+                    forecast = {'list': [], 'cod': "200"}
+            forecast_frame = build_forecast_frame(forecast)
+
+            aqi_res = results['air_quality']
+            aqi = 1
+            if aqi_res.status_code != 200:
+                warnings.append("Air quality data unavailable.")
+            elif aqi_res.payload.get('cod', 200) == 200 and aqi_res.payload.get('list'):
+                aqi = int(aqi_res.payload['list'][0]['main']['aqi'])
+
+            snapshot = WeatherSnapshot(
+                current=current,
+                forecast=forecast_frame,
+                daily=daily_summary(forecast_frame),
+                aqi=aqi,
+                pollen=simulate_pollen_data(current),
+                alerts=tuple(get_weather_alerts(current))
+            )
+            return WeatherResult(snapshot, errors, warnings)
+        except Exception as e:
+            return WeatherResult(None, [f"Comprehensive weather fetch failed: {e}"], warnings)
+
+    def get_current_batch(self, locations):
+        """CurrentConditions (or None on failure) for each (lat, lon), in order"""
+        if not self.openweather_key:
+            return [None] * len(locations)
+        results = fetch_current_batch(locations, self.openweather_key, 'metric',
+                                      cache=get_response_cache(), limiter=get_openweather_limiter())
+        return [
+            CurrentConditions.from_payload(result.payload) if result.status_code == 200 and result.payload else None
+            for result in results
+        ]
+_service = None
+_service_lock = threading.Lock()
+def get_weather_service():
+    """Process-wide service; the Streamlit app and server.py both go through it"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WeatherService()
+    return _service